@@ -20,11 +20,13 @@
 from gi.repository import Gtk, Gdk, GdkPixbuf, Gio, Gst
 import cairo
 import os
-import re
 import json
 import urllib.request
 import urllib.parse
+import hashlib
 from math import pi
+from threading import Lock, get_ident
+from collections import OrderedDict
 
 from lollypop.define import Objects, ArtSize
 
@@ -34,12 +36,31 @@ class AlbumArt:
 
     _CACHE_PATH = os.path.expanduser("~") + "/.cache/lollypop"
     _mimes = ["jpeg", "jpg", "png", "gif"]
+    # Sizes covers are cached at
+    _SIZES = [ArtSize.SMALL, ArtSize.MEDIUM, ArtSize.BIG, ArtSize.MONSTER]
+    # Max memory used by framed pixbufs kept by get(), in bytes
+    _MEMORY_CACHE_SIZE = 32 * 1024 * 1024
 
     """
         Create cache path
     """
     def __init__(self):
         self._gtk_settings = Gtk.Settings.get_default()
+        # Frames depend on theme
+        self._gtk_settings.connect('notify::gtk-application-prefer-dark-theme',
+                                   self._on_theme_changed)
+        # Framed pixbufs, least recently used first
+        # {(album id, size, selected): (pixbuf, bytes)}
+        self._pixbufs = OrderedDict()
+        self._pixbufs_size = 0
+        self._pixbufs_lock = Lock()
+        # Cache file names as {album id: md5 of album and artist names}
+        self._keys = {}
+        # Default covers as {size: pixbuf}, loaded here as
+        # Gtk.IconTheme is not thread safe
+        self._defaults = {}
+        for size in self._SIZES:
+            self.get_default(size)
         self._favorite = Objects.settings.get_value(
                                                 'favorite-cover').get_string()
         if not os.path.exists(self._CACHE_PATH):
@@ -57,6 +78,8 @@ class AlbumArt:
         path = None
         try:
             path = self._get_cache_path(album_id)
+            if path is None:
+                return None
             CACHE_PATH_JPG = "%s/%s_%s.jpg" % (self._CACHE_PATH, path, size)
             if os.path.exists(CACHE_PATH_JPG):
                 return CACHE_PATH_JPG
@@ -114,7 +137,16 @@ class AlbumArt:
         return: pixbuf
     """
     def get(self, album_id, size, selected=False):
+        key = (album_id, size, selected)
+        pixbuf = self._get_from_memory(key)
+        if pixbuf is not None:
+            return pixbuf
+
         path = self._get_cache_path(album_id)
+        if path is None:
+            return self._make_icon_frame(self.get_default(size),
+                                         size,
+                                         selected)
         CACHE_PATH_JPG = "%s/%s_%s.jpg" % (self._CACHE_PATH, path, size)
         pixbuf = None
 
@@ -124,78 +156,134 @@ class AlbumArt:
                 pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(CACHE_PATH_JPG,
                                                                 size,
                                                                 size)
+            # Cache requested size, others are cached in background
             else:
-                path = self.get_art_path(album_id)
-                # Look in album folder
-                if path:
-                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path,
-                                                                     size,
-                                                                     size,
-                                                                     False)
-                # Try to get from tags
-                else:
-                    try:
-                        tracks = Objects.albums.get_tracks(album_id, None)
-                        if tracks:
-                            pixbuf = self._pixbuf_from_tags(tracks[0], size)
-                    except Exception as e:
-                        print(e)
-                        return self._make_icon_frame(
-                                            self._get_default_icon(size),
-                                            size,
-                                            selected)
-
-                # No cover, use default one
-                if pixbuf is None:
-                    pixbuf = self._get_default_icon(size)
-
-                # Gdk < 3.15 was missing save method
-                # > 3.15 is missing savev method
-                try:
-                    pixbuf.save(CACHE_PATH_JPG, "jpeg",
-                                ["quality"], ["90"])
-                except:
-                    pixbuf.savev(CACHE_PATH_JPG, "jpeg",
-                                 ["quality"], ["90"])
-
-            return self._make_icon_frame(pixbuf, size, selected)
+                self._cache_sizes(album_id, [size])
+                Objects.thumbnailer.add([album_id], False)
+                if not os.path.exists(CACHE_PATH_JPG):
+                    return self._make_icon_frame(self.get_default(size),
+                                                 size,
+                                                 selected)
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(CACHE_PATH_JPG,
+                                                                size,
+                                                                size)
+
+            pixbuf = self._make_icon_frame(pixbuf, size, selected)
+            self._add_to_memory(key, pixbuf)
+            return pixbuf
 
         except Exception as e:
             print(e)
-            return self._make_icon_frame(self._get_default_icon(size),
+            return self._make_icon_frame(self.get_default(size),
                                          size,
                                          selected)
 
     """
-        Remove all covers from cache
+        Return cover for album_id if already in cache, thread safe
+        Use get() for a framed cover
+        @param album id as int
+        @param pixbuf size as int
         @param sql as sqlite cursor
+        @return pixbuf or None
     """
-    def clean_all_cache(self, sql=None):
-        albums = Objects.albums.get_ids(None, None, sql)
-        files = os.listdir(self._CACHE_PATH)
-        for album_id in albums:
+    def get_cached(self, album_id, size, sql=None):
+        try:
             path = self._get_cache_path(album_id, sql)
-            for f in files:
-                if re.search('%s_.*\.jpg' % re.escape(path), f):
-                    try:
-                        os.remove(os.path.join(self._CACHE_PATH, f))
-                        files.remove(f)
-                    except Exception as e:
-                        print("AlbumArt::clean_all_cache(): ", e, path)
+            if path is None:
+                return None
+            CACHE_PATH_JPG = "%s/%s_%s.jpg" % (self._CACHE_PATH, path, size)
+            if os.path.exists(CACHE_PATH_JPG):
+                return GdkPixbuf.Pixbuf.new_from_file_at_size(CACHE_PATH_JPG,
+                                                              size,
+                                                              size)
+        except Exception as e:
+            print("AlbumArt::get_cached(): %s" % e)
+        return None
 
     """
-        Remove cover from cache for album id
+        Return pixbuf with a frame, as returned by get()
+        @param pixbuf as Gdk.Pixbuf
+        @param pixbuf size as int
+        @param selected as bool
+        @return pixbuf
+    """
+    def get_frame(self, pixbuf, size, selected=False):
+        return self._make_icon_frame(pixbuf, size, selected)
+
+    """
+        Return default cover, not framed
+        @param size as int
+        @return pixbuf
+        @thread safe for cached sizes
+    """
+    def get_default(self, size):
+        pixbuf = self._defaults.get(size)
+        if pixbuf is None:
+            pixbuf = self._get_default_icon(size)
+            self._defaults[size] = pixbuf
+        return pixbuf
+
+    """
+        True if album cover is in cache for size
+        @param album id as int
+        @param size as int
+        @return bool
+    """
+    def is_cached(self, album_id, size):
+        if self._get_from_memory((album_id, size, False)) is not None:
+            return True
+        path = self._get_cache_path(album_id)
+        if path is None:
+            return False
+        return os.path.exists("%s/%s_%s.jpg" % (self._CACHE_PATH, path, size))
+
+    """
+        Cache album cover at all sizes, source is only decoded once
         @param album id as int
         @param sql as sqlite cursor
+        @return True if cache changed
+        @thread safe
     """
-    def clean_cache(self, album_id, sql=None):
-        path = self._get_cache_path(album_id, sql)
+    def cache_album(self, album_id, sql=None):
+        return self._cache_sizes(album_id, self._SIZES, sql)
+
+    """
+        Remove all covers from cache
+    """
+    def clean_all_cache(self):
+        self._remove_from_memory()
+        self._keys = {}
         try:
             for f in os.listdir(self._CACHE_PATH):
-                if re.search('%s_.*\.jpg' % re.escape(path), f):
+                if f.endswith(".jpg"):
                     os.remove(os.path.join(self._CACHE_PATH, f))
         except Exception as e:
-            print("AlbumArt::clean_cache(): ", e, path)
+            print("AlbumArt::clean_all_cache(): %s" % e)
+
+    """
+        Remove cover from cache for album id
+        @param album id as int
+        @param sql as sqlite cursor
+    """
+    def clean_cache(self, album_id, sql=None):
+        self._remove_from_memory(album_id)
+        path = self._get_cache_path(album_id, sql)
+        if path is None:
+            return
+        for size in self._SIZES:
+            CACHE_PATH_JPG = "%s/%s_%s.jpg" % (self._CACHE_PATH, path, size)
+            try:
+                if os.path.exists(CACHE_PATH_JPG):
+                    os.remove(CACHE_PATH_JPG)
+            except Exception as e:
+                print("AlbumArt::clean_cache(): ", e, CACHE_PATH_JPG)
+
+    """
+        Forget album ids, albums may have been removed or changed
+    """
+    def reset_keys(self):
+        self._remove_from_memory()
+        self._keys = {}
 
     """
         Save pixbuf for album id
@@ -203,6 +291,7 @@ class AlbumArt:
         @param album id as int
     """
     def save_art(self, pixbuf, album_id):
+        self._remove_from_memory(album_id)
         album_path = Objects.albums.get_path(album_id)
         path_count = Objects.albums.get_path_count(album_path)
         album_name = Objects.albums.get_name(album_id)
@@ -259,10 +348,11 @@ class AlbumArt:
         Return cover from tags
         @param track id as int
         @param size as int
+        @param sql as sqlite cursor
     """
-    def _pixbuf_from_tags(self, track_id, size):
+    def _pixbuf_from_tags(self, track_id, size, sql=None):
         pixbuf = None
-        filepath = Objects.tracks.get_path(track_id)
+        filepath = Objects.tracks.get_path(track_id, sql)
         infos = Objects.player.get_infos(filepath)
         exist = False
         if infos is not None:
@@ -280,14 +370,182 @@ class AlbumArt:
         return pixbuf
 
     """
-        Get a uniq string for album
+        Cache album cover at missing sizes
+        Source is decoded once at biggest size, smaller sizes
+        are scaled down from the previous one
+        @param album id as int
+        @param sizes as [int]
+        @param sql as sqlite cursor
+        @return True if cache changed
+        @thread safe
+    """
+    def _cache_sizes(self, album_id, sizes, sql=None):
+        path = self._get_cache_path(album_id, sql)
+        if path is None:
+            return False
+        missing = []
+        for size in sizes:
+            if not os.path.exists("%s/%s_%s.jpg" % (self._CACHE_PATH,
+                                                    path, size)):
+                missing.append(size)
+        if not missing:
+            return False
+        missing.sort(reverse=True)
+        try:
+            source = self._get_source(album_id, missing[0], sql)
+        except Exception as e:
+            print("AlbumArt::_cache_sizes(): %s" % e)
+            return False
+        changed = False
+        for size in missing:
+            if source is None:
+                pixbuf = self.get_default(size)
+            else:
+                source = self._scale_down(source, size)
+                pixbuf = source
+            CACHE_PATH_JPG = "%s/%s_%s.jpg" % (self._CACHE_PATH, path, size)
+            if self._save_pixbuf(pixbuf, CACHE_PATH_JPG):
+                changed = True
+        return changed
+
+    """
+        Scale pixbuf down to size, never more than half at once
+        as bilinear interpolation skips pixels with big ratios
+        @param pixbuf as Gdk.Pixbuf
+        @param size as int
+        @return pixbuf
+    """
+    def _scale_down(self, pixbuf, size):
+        width = pixbuf.get_width()
+        while width // 2 > size:
+            width //= 2
+            pixbuf = pixbuf.scale_simple(width, width,
+                                         GdkPixbuf.InterpType.BILINEAR)
+        if width != size:
+            pixbuf = pixbuf.scale_simple(size, size,
+                                         GdkPixbuf.InterpType.BILINEAR)
+        return pixbuf
+
+    """
+        Return album cover from album folder or tags
+        @param album id as int
+        @param size as int
+        @param sql as sqlite cursor
+        @return pixbuf or None
+    """
+    def _get_source(self, album_id, size, sql=None):
+        path = self.get_art_path(album_id, sql)
+        if path:
+            return GdkPixbuf.Pixbuf.new_from_file_at_scale(path,
+                                                           size,
+                                                           size,
+                                                           False)
+        tracks = Objects.albums.get_tracks(album_id, None, sql)
+        if tracks:
+            return self._pixbuf_from_tags(tracks[0], size, sql)
+        return None
+
+    """
+        Save pixbuf as jpg, file is written aside then moved,
+        so readers never get a partial file
+        @param pixbuf as Gdk.Pixbuf
+        @param path as str
+        @return True if saved
+        @thread safe
+    """
+    def _save_pixbuf(self, pixbuf, path):
+        tmp_path = "%s.%s.tmp" % (path, get_ident())
+        try:
+            # Gdk < 3.15 was missing save method
+            try:
+                pixbuf.save(tmp_path, "jpeg", ["quality"], ["90"])
+            # > 3.15 is missing savev method
+            except:
+                pixbuf.savev(tmp_path, "jpeg", ["quality"], ["90"])
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print("AlbumArt::_save_pixbuf(): %s" % e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    """
+        Return framed pixbuf kept in memory
+        @param key as (album id as int, size as int, selected as bool)
+        @return pixbuf or None
+        @thread safe
+    """
+    def _get_from_memory(self, key):
+        with self._pixbufs_lock:
+            value = self._pixbufs.get(key)
+            if value is None:
+                return None
+            self._pixbufs.move_to_end(key)
+            return value[0]
+
+    """
+        Keep framed pixbuf in memory, drop least recently used ones
+        if memory cache is full
+        @param key as (album id as int, size as int, selected as bool)
+        @param pixbuf as Gdk.Pixbuf
+        @thread safe
+    """
+    def _add_to_memory(self, key, pixbuf):
+        size = pixbuf.get_rowstride() * pixbuf.get_height()
+        if size > self._MEMORY_CACHE_SIZE:
+            return
+        with self._pixbufs_lock:
+            old = self._pixbufs.pop(key, None)
+            if old is not None:
+                self._pixbufs_size -= old[1]
+            self._pixbufs[key] = (pixbuf, size)
+            self._pixbufs_size += size
+            while self._pixbufs_size > self._MEMORY_CACHE_SIZE:
+                (pixbuf, size) = self._pixbufs.popitem(last=False)[1]
+                self._pixbufs_size -= size
+
+    """
+        Remove framed pixbufs from memory
+        @param album id as int, None for all albums
+        @thread safe
+    """
+    def _remove_from_memory(self, album_id=None):
+        with self._pixbufs_lock:
+            if album_id is None:
+                self._pixbufs = OrderedDict()
+                self._pixbufs_size = 0
+                return
+            for key in list(self._pixbufs.keys()):
+                if key[0] == album_id:
+                    self._pixbufs_size -= self._pixbufs.pop(key)[1]
+
+    """
+        Drop framed pixbufs, frame colors changed
+        @param settings as Gtk.Settings
+        @param param as GObject.ParamSpec
+    """
+    def _on_theme_changed(self, settings, param):
+        self._remove_from_memory()
+
+    """
+        Get a uniq string for album, names are only read once
         @param album id as int
         @param sql as sqlite cursor
+        @return string or None if album does not exist
+        @thread safe
     """
     def _get_cache_path(self, album_id, sql=None):
-        path = Objects.albums.get_name(album_id, sql) + "_" + \
-               Objects.albums.get_artist_name(album_id, sql)
-        return path[0:240].replace("/", "_")
+        key = self._keys.get(album_id)
+        if key is None:
+            names = Objects.albums.get_names([album_id], sql).get(album_id)
+            if names is None:
+                return None
+            (album_name, artist_name) = names
+            key = hashlib.md5(("%s_%s" % (album_name, artist_name)).encode(
+                                                     'utf-8')).hexdigest()
+            self._keys[album_id] = key
+        return key
 
     """
         Draw an icon frame around pixbuf,
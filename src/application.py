@@ -20,6 +20,7 @@ from lollypop.window import Window
 from lollypop.database import Database
 from lollypop.player import Player
 from lollypop.albumart import AlbumArt
+from lollypop.thumbnailer import Thumbnailer
 from lollypop.settings import SettingsDialog
 from lollypop.mpris import MPRIS
 from lollypop.notification import NotificationManager
@@ -27,6 +28,7 @@ from lollypop.database_albums import DatabaseAlbums
 from lollypop.database_artists import DatabaseArtists
 from lollypop.database_genres import DatabaseGenres
 from lollypop.database_tracks import DatabaseTracks
+from lollypop.database_search import DatabaseSearch
 from lollypop.playlists import PlaylistsManager
 from lollypop.fullscreen import FullScreen
 
@@ -71,8 +73,10 @@ class Application(Gtk.Application):
         Objects.artists = DatabaseArtists()
         Objects.genres = DatabaseGenres()
         Objects.tracks = DatabaseTracks()
+        Objects.search = DatabaseSearch()
         Objects.playlists = PlaylistsManager()
         Objects.art = AlbumArt()
+        Objects.thumbnailer = Thumbnailer()
 
         settings = Gtk.Settings.get_default()
         dark = Objects.settings.get_value('dark-ui')
@@ -166,11 +170,14 @@ class Application(Gtk.Application):
                                        'i',
                                        track_id))
         Objects.player.stop()
+        Objects.thumbnailer.stop()
         if Objects.window:
             Objects.window.stop_all()
 
         try:
             Objects.tracks.remove_outside()
+            Objects.search.clean()
+            Objects.sql.commit()
             Objects.sql.execute("VACUUM")
         except Exception as e:
             print("Application::quit(): ", e)
@@ -13,12 +13,14 @@
 
 import os
 from time import sleep, time
-from gettext import gettext as _
 from gi.repository import GLib, GObject, Gio
 from _thread import start_new_thread
 
-from lollypop.define import Objects, Navigation
-from lollypop.utils import format_artist_name, is_audio, debug
+from lollypop.define import Objects
+from lollypop.utils import is_audio, debug
+from lollypop.tagreader import TagReaderPool
+from lollypop.tagcache import TagCache
+from lollypop.collectionwriter import CollectionWriter
 
 
 class CollectionScanner(GObject.GObject):
@@ -26,8 +28,14 @@ class CollectionScanner(GObject.GObject):
         'scan-finished': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'artist-update': (GObject.SignalFlags.RUN_FIRST, None, (int, int)),
         'genre-update': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
-        'added': (GObject.SignalFlags.RUN_FIRST, None, (int, bool))
+        'added': (GObject.SignalFlags.RUN_FIRST, None, (int, bool)),
+        'update-cancelled': (GObject.SignalFlags.RUN_FIRST, None,
+                             (GObject.TYPE_PYOBJECT,))
     }
+    # Tracks written per transaction
+    _BATCH_SIZE = 1000
+    # Directories modified in last seconds are listed on next scan
+    _MTIME_DELAY = 2
 
     """
         @param progress as Gtk.Progress
@@ -39,30 +47,50 @@ class CollectionScanner(GObject.GObject):
         self._is_empty = True
         self._in_thread = False
         self._is_locked = False
+        self._tagcache = TagCache()
 
     """
         Update database
         @param smooth as bool, if smooth, try to scan smoothly
     """
     def update(self, smooth):
-        paths = Objects.settings.get_value('music-path')
+        paths = self.get_music_paths()
         if not paths:
-            if GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_MUSIC):
-                paths = [GLib.get_user_special_dir(
-                                          GLib.UserDirectory.DIRECTORY_MUSIC)]
-            else:
-                print("You need to add a music path"
-                      " to org.gnome.Lollypop in dconf")
-                return
+            return
 
         if not self._in_thread:
             self._progress.show()
             self._in_thread = True
             self._is_locked = True
             self._compilations = []
-            self._mtimes = Objects.tracks.get_mtimes()
             start_new_thread(self._scan, (paths, smooth))
 
+    """
+        Update database for changed paths only
+        Paths may be files or directories, existing or not
+        @param paths as [str]
+    """
+    def update_paths(self, paths):
+        if paths and not self._in_thread:
+            self._in_thread = True
+            self._is_locked = True
+            start_new_thread(self._update_paths, (paths,))
+
+    """
+        Return music paths to scan
+        @return [str]
+    """
+    def get_music_paths(self):
+        paths = Objects.settings.get_value('music-path')
+        if not paths:
+            if GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_MUSIC):
+                paths = [GLib.get_user_special_dir(
+                                          GLib.UserDirectory.DIRECTORY_MUSIC)]
+            else:
+                print("You need to add a music path"
+                      " to org.gnome.Lollypop in dconf")
+        return list(paths)
+
     """
         Add specified files to collection
         @param files as [Gio.Files]
@@ -102,14 +130,88 @@ class CollectionScanner(GObject.GObject):
         Notify from main thread when scan finished
     """
     def _finish(self):
+        # Albums may have been removed, their ids reused
+        Objects.art.reset_keys()
         self._progress.hide()
         self._progress.set_fraction(0.0)
         self._in_thread = False
         self._is_locked = False
         self.emit("scan-finished")
 
+    """
+        Walk path, symlinked directories are not followed
+        Directories with an unchanged mtime are not listed again,
+        their files and sub directories are taken from tree
+        @param path as str
+        @param mtimes as {path as str: mtime as int}, filled with
+               directories mtimes if not None, 0 if not listed
+        @param tree as _get_tree(), None for a full walk
+        @return generator of (filepath as str, stat as os.stat_result)
+        @thread safe
+    """
+    def _walk(self, path, mtimes=None, tree=None):
+        dirs = [path]
+        while dirs:
+            path = dirs.pop()
+            # Directory will be listed again on next scan
+            if mtimes is not None:
+                mtimes[path] = 0
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if tree is not None and path in tree and\
+                   tree[path][0] == mtime:
+                    (mtime, files, subdirs) = tree[path]
+                    if mtimes is not None:
+                        mtimes[path] = mtime
+                    dirs += subdirs
+                    for filepath in files:
+                        try:
+                            yield (filepath, os.stat(filepath))
+                        except OSError as e:
+                            debug("CollectionScanner::_walk(): %s" % e)
+                    continue
+                entries = list(os.scandir(path))
+                # Directory may change again in same timestamp unit
+                if mtimes is not None and\
+                   time() - mtime / 1000000000 > self._MTIME_DELAY:
+                    mtimes[path] = mtime
+            except OSError as e:
+                debug("CollectionScanner::_walk(): %s" % e)
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.is_file():
+                        yield (entry.path, entry.stat())
+                except OSError as e:
+                    debug("CollectionScanner::_walk(): %s" % e)
+
+    """
+        Get collection layout from db
+        @param filepaths as [str], known tracks
+        @return {path as str: (mtime as int, [file paths],
+                               [directory paths])}
+            for directories known in db
+        @thread safe
+    """
+    def _get_tree(self, filepaths, sql):
+        tree = {}
+        for (path, mtime) in Objects.tracks.get_dir_mtimes(sql).items():
+            tree[path] = (mtime, [], [])
+        for path in tree.keys():
+            parent = os.path.dirname(path)
+            if parent != path and parent in tree:
+                tree[parent][2].append(path)
+        for filepath in filepaths:
+            parent = os.path.dirname(filepath)
+            if parent in tree:
+                tree[parent][1].append(filepath)
+        return tree
+
     """
         Clean track's compilation if needed
+        Search index is updated if album artist changed
         @param album id as int
     """
     def _clean_compilation(self, album_id, sql=None):
@@ -123,6 +225,7 @@ class CollectionScanner(GObject.GObject):
             filepath = Objects.tracks.get_path(tracks[0], sql)
             path = os.path.dirname(filepath)
             Objects.albums.set_path(album_id, path, sql)
+            Objects.search.update_albums([album_id], sql)
 
     """
         Add specified files to collection
@@ -132,7 +235,9 @@ class CollectionScanner(GObject.GObject):
     def _add(self, files):
         GLib.idle_add(self._progress.show)
         sql = Objects.db.get_cursor()
-        tracks = Objects.tracks.get_paths(sql)
+        tracks = set(Objects.tracks.get_paths(sql))
+        writer = CollectionWriter(True, False, sql)
+        cache = self._tagcache.get_cursor()
         count = len(files)
         i = 0
         GLib.idle_add(self._update_progress, i, count)
@@ -140,26 +245,34 @@ class CollectionScanner(GObject.GObject):
             track_id = None
             if not self._in_thread:
                 sql.close()
+                if cache is not None:
+                    cache.close()
                 self._is_locked = False
                 return
             if f not in tracks:
-                infos = Objects.player.get_infos(f)
-                if infos is not None:
+                tags = self._get_file_tags(f, cache)
+                if tags is not None:
                     debug("Adding file: %s" % f)
-                    track_id = self._add2db(f, 0, infos, True, sql)
+                    writer.add(f, 0, tags)
+                    track_ids = self._flush(writer)
+                    if track_ids is not None:
+                        track_id = track_ids.get(f)
                 else:
                     print("Can't get infos for ", f)
             else:
                 track_id = Objects.tracks.get_id_by_path(f, sql)
             if track_id is not None:
-                if i == 0:
-                    sql.commit()
                 GLib.idle_add(self.emit, "added", track_id, i==0)
             i += 1
             GLib.idle_add(self._update_progress, i, count)
+        album_ids = writer.get_album_ids()
+        writer.update_years()
         Objects.albums.search_compilations(True, sql)
+        Objects.search.update_albums(album_ids, sql)
         sql.commit()
         sql.close()
+        if cache is not None:
+            cache.close()
         GLib.idle_add(self._progress.hide)
         self._in_thread = False
         self._is_locked = False
@@ -172,72 +285,104 @@ class CollectionScanner(GObject.GObject):
     """
     def _scan(self, paths, smooth):
         sql = Objects.db.get_cursor()
-        tracks = Objects.tracks.get_paths(sql)
+        stats = Objects.tracks.get_stats(sql)
+        # Known tracks not seen on disk will be removed
+        tracks = set(stats.keys())
         self._is_empty = len(tracks) == 0
         # Clear cover cache
         if not smooth:
-            Objects.art.clean_all_cache(sql)
+            Objects.art.clean_all_cache()
 
-        new_tracks = []
+        # Look for new or modified files, only stat known files
+        # Only list directories changed since last scan
+        if smooth:
+            tree = self._get_tree(stats.keys(), sql)
+        else:
+            tree = None
+        dir_mtimes = {}
+        to_read = []
+        new_stats = {}
+        backfill = []
+        modified = set()
         count = 0
         for path in paths:
-            for root, dirs, files in os.walk(path):
-                for name in files:
-                    filepath = os.path.join(root, name)
-                    f = Gio.File.new_for_path(filepath)
-                    if is_audio(f):
-                        new_tracks.append(filepath)
+            for (filepath, st) in self._walk(path, dir_mtimes, tree):
+                if not self._in_thread:
+                    sql.close()
+                    self._is_locked = False
+                    return
+                try:
+                    stat = (int(st.st_mtime), st.st_size, st.st_ino)
+                    known = stats.get(filepath)
+                    if known is not None:
                         count += 1
-                    else:
-                        debug("%s not detected as a music file" % filepath)
-        i = 0
-        for filepath in new_tracks:
+                        tracks.discard(filepath)
+                    if self._need_read(filepath, stat, known,
+                                       backfill, modified):
+                        if known is None:
+                            count += 1
+                        to_read.append(filepath)
+                        new_stats[filepath] = stat
+                except Exception as e:
+                    print(ascii(filepath))
+                    print("CollectionScanner::_scan(): %s" % e)
+        self._write_stats(backfill, sql)
+        i = count - len(to_read)
+        if count:
+            GLib.idle_add(self._update_progress, i, count)
+
+        # Read tags in workers, we are the only db writer
+        writer = CollectionWriter(False, self._is_empty, sql)
+        for (filepath, tags) in self._get_tags(to_read, new_stats):
             if not self._in_thread:
-                sql.close()
-                self._is_locked = False
-                return
+                break
             GLib.idle_add(self._update_progress, i, count)
-            mtime = int(os.path.getmtime(filepath))
             try:
-                if filepath not in tracks:
-                    infos = Objects.player.get_infos(filepath)
-                    if infos is not None:
-                        debug("Adding file: %s" % filepath)
-                        self._add2db(filepath, mtime, infos, False, sql)
-                    else:
-                        print("Can't get infos for ", filepath)
+                # Outdated track is removed when its update is written
+                if filepath in modified:
+                    writer.remove(filepath)
+                if tags is not None:
+                    debug("Adding file: %s" % filepath)
+                    (mtime, size, inode) = new_stats[filepath]
+                    writer.add(filepath, mtime, tags, size, inode)
+                    if writer.count() >= self._BATCH_SIZE:
+                        self._flush(writer, dir_mtimes)
                 else:
-                    # Update tags by removing song and readd it
-                    if mtime != self._mtimes[filepath]:
-                        track_id = Objects.tracks.get_id_by_path(filepath, sql)
-                        album_id = Objects.tracks.get_album_id(track_id, sql)
-                        Objects.tracks.remove(filepath, sql)
-                        self._clean_compilation(album_id, sql)
-                        infos = Objects.player.get_infos(filepath)
-                        if infos is not None:
-                            debug("Adding file: %s" % filepath)
-                            self._add2db(filepath, mtime, infos, False, sql)
-                        else:
-                            print("Can't get infos for ", filepath)
-                    tracks.remove(filepath)
-
+                    print("Can't get infos for ", filepath)
+                    # Try again on next scan
+                    dir_mtimes[os.path.dirname(filepath)] = 0
             except Exception as e:
                 print(ascii(filepath))
                 print("CollectionScanner::_scan(): %s" % e)
             i += 1
             if smooth:
                 sleep(0.001)
+        if not self._in_thread:
+            sql.close()
+            self._is_locked = False
+            return
+        self._flush(writer, dir_mtimes)
+        for album_id in writer.get_removed_album_ids():
+            self._clean_compilation(album_id, sql)
+        album_ids = writer.get_album_ids()
+        writer.update_years()
+        # All files read, directories are now up to date
+        Objects.tracks.set_dir_mtimes(dir_mtimes, sql)
 
         # Clean deleted files
-        if i > 0:
-            for filepath in tracks:
-                track_id = Objects.tracks.get_id_by_path(filepath, sql)
-                album_id = Objects.tracks.get_album_id(track_id, sql)
-                Objects.tracks.remove(filepath, sql)
+        if i > 0 and tracks:
+            for album_id in Objects.tracks.remove_many(tracks, sql):
                 self._clean_compilation(album_id, sql)
+                album_ids.add(album_id)
+            cache = self._tagcache.get_cursor()
+            self._tagcache.remove(tracks, cache)
+            if cache is not None:
+                cache.close()
 
         Objects.tracks.clean(sql)
         Objects.albums.search_compilations(False, sql)
+        Objects.search.update_albums(album_ids, sql)
+        Objects.search.clean(sql)
         self._restore_popularities(sql)
         self._restore_mtimes(sql)
         sql.commit()
@@ -245,153 +390,243 @@ class CollectionScanner(GObject.GObject):
         GLib.idle_add(self._finish)
 
     """
-        Add new file to db with informations
-        @param filepath as string
-        @param file modification time as int
-        @param infos as GstPbutils.DiscovererInfo
-        @param outside as bool
-        @param sql as sqlite cursor
-        @return track id as int
+        Update database for changed paths
+        @param paths as [str]
+        @thread safe
     """
-    def _add2db(self, filepath, mtime, infos, outside, sql):
-        self._new_artists = []
-        self._new_genres = []
-        path = os.path.dirname(filepath)
-
-        tags = infos.get_tags()
-
-        (exist, title) = tags.get_string_index('title', 0)
-        if not exist:
-            title = os.path.basename(filepath)
-
-        (exist, artists) = tags.get_string_index('artist', 0)
-        if not exist:
-            artists = _("Unknown")
+    def _update_paths(self, paths):
+        sql = Objects.db.get_cursor()
+        changed = False
+        try:
+            changed = self._update_paths_db(paths, sql)
+        except Exception as e:
+            sql.rollback()
+            print("CollectionScanner::_update_paths(): %s" % e)
+        finally:
+            sql.close()
+            if changed:
+                GLib.idle_add(self._finish)
+            else:
+                self._in_thread = False
+                self._is_locked = False
 
-        artists = ""
-        size = tags.get_tag_size('artist')
-        if size == 0:
-            artists = _("Unknown")
-        else:
-            for i in range(0, size):
-                (exist, artist) = tags.get_string_index('artist', i)
-                artists += artist
-                if i < size-1:
-                    artists += ";"
-
-        (exist, aartist) = tags.get_string_index('album-artist', 0)
-        if not exist:
-            aartist = None
-
-        (exist, album) = tags.get_string_index('album', 0)
-        if not exist:
-            album = _("Unknown")
-
-        genres = ""
-        size = tags.get_tag_size('genre')
-        if size == 0:
-            genres = _("Unknown")
-        else:
-            for i in range(0, size):
-                (exist, genre) = tags.get_string_index('genre', i)
-                genres += genre
-                if i < size-1:
-                    genres += ";"
-
-        (exist, discnumber) = tags.get_uint_index('album-disc-number', 0)
-        if not exist:
-            discnumber = 0
-
-        (exist, tracknumber) = tags.get_uint_index('track-number', 0)
-        if not exist:
-            tracknumber = 0
-
-        (exist, datetime) = tags.get_date_time('datetime')
-        if exist:
-            year = datetime.get_year()
-        else:
-            year = None
-
-        length = infos.get_duration()/1000000000
-
-        # Get all artist ids
-        artist_ids = []
-        for word in artists.split(';'):
-            artist = format_artist_name(word)
-            # Get artist id, add it if missing
-            artist_id = Objects.artists.get_id(artist, sql)
-            if artist_id is None:
-                Objects.artists.add(artist, outside, sql)
-                artist_id = Objects.artists.get_id(artist, sql)
-                if artist == aartist:
-                    self._new_artists.append(artist_id)
-            artist_ids.append(artist_id)
-
-        if aartist:
-            aartist = format_artist_name(aartist)
-            # Get aartist id, add it if missing
-            aartist_id = Objects.artists.get_id(aartist, sql)
-            if aartist_id is None:
-                Objects.artists.add(aartist, outside, sql)
-                aartist_id = Objects.artists.get_id(aartist, sql)
-                self._new_artists.append(aartist_id)
-        else:
-            aartist_id = Navigation.COMPILATIONS
-
-        # Get all genre ids
-        genre_ids = []
-        for genre in genres.split(';'):
-            # Get genre id, add genre if missing
-            genre_id = Objects.genres.get_id(genre, sql)
-            if genre_id is None:
-                Objects.genres.add(genre, outside, sql)
-                genre_id = Objects.genres.get_id(genre, sql)
-                self._new_genres.append(genre_id)
-            genre_ids.append(genre_id)
-
-        album_id = Objects.albums.get_id(album, aartist_id, sql)
-        if album_id is None:
-            # If db was empty on scan,
-            # use file modification time to get recents
-            if self._is_empty:
-                mtime = int(os.path.getmtime(filepath))
-            # Use current time
+    """
+        Update database for changed paths
+        If stopped, paths not written are sent with "update-cancelled"
+        @param paths as [str]
+        @param sql as sqlite cursor
+        @return True if collection changed
+        @thread safe
+    """
+    def _update_paths_db(self, paths, sql):
+        # Paths under a changed directory are walked with it
+        dirs = [path + os.sep for path in paths if os.path.isdir(path)]
+        paths = [path for path in set(paths)
+                 if not any(path.startswith(d) for d in dirs)]
+        seen = set()
+        to_read = []
+        new_stats = {}
+        backfill = []
+        modified = set()
+        deleted = []
+        changed = False
+        for path in paths:
+            # Tracks in db for path, remaining ones have been deleted
+            stats = Objects.tracks.get_stats_in(path, sql)
+            files = []
+            try:
+                if os.path.isdir(path):
+                    files = list(self._walk(path))
+                elif os.path.isfile(path):
+                    files.append((path, os.stat(path)))
+            except OSError as e:
+                debug("CollectionScanner::_update_paths(): %s" % e)
+            for (filepath, st) in files:
+                if filepath in seen:
+                    continue
+                seen.add(filepath)
+                stat = (int(st.st_mtime), st.st_size, st.st_ino)
+                known = stats.pop(filepath, None)
+                try:
+                    if self._need_read(filepath, stat, known,
+                                       backfill, modified):
+                        to_read.append(filepath)
+                        new_stats[filepath] = stat
+                        changed = True
+                except Exception as e:
+                    print(ascii(filepath))
+                    print("CollectionScanner::_update_paths(): %s" % e)
+            if stats:
+                deleted += stats.keys()
+                changed = True
+        self._write_stats(backfill, sql)
+
+        writer = CollectionWriter(False, False, sql)
+        # Files written to db
+        written = set()
+        for (filepath, tags) in self._get_tags(to_read, new_stats):
+            if not self._in_thread:
+                break
+            # Outdated track is removed when its update is written
+            if filepath in modified:
+                writer.remove(filepath)
+            if tags is not None:
+                debug("Adding file: %s" % filepath)
+                (mtime, size, inode) = new_stats[filepath]
+                writer.add(filepath, mtime, tags, size, inode)
+                if writer.count() >= self._BATCH_SIZE:
+                    written |= set(self._flush(writer) or {})
             else:
-                mtime = int(time())
-            Objects.albums.add(album, aartist_id,
-                               path, 0, outside, mtime, sql)
-            album_id = Objects.albums.get_id(album, aartist_id, sql)
+                print("Can't get infos for ", filepath)
+        if self._in_thread:
+            # Clean deleted files
+            for filepath in deleted:
+                writer.remove(filepath)
+            written |= set(self._flush(writer) or {})
+        else:
+            # Drop buffered tracks, send unread paths to watcher again
+            sql.rollback()
+            unread = [filepath for filepath in to_read
+                      if filepath not in written] + deleted
+            GLib.idle_add(self.emit, "update-cancelled", unread)
+            changed = len(written) > 0 or\
+                len(writer.get_removed_album_ids()) > 0
+        for album_id in writer.get_removed_album_ids():
+            self._clean_compilation(album_id, sql)
+        album_ids = writer.get_album_ids()
+        writer.update_years()
+
+        if changed:
+            Objects.tracks.clean(sql)
+            Objects.albums.search_compilations(False, sql)
+            Objects.search.update_albums(album_ids, sql)
+            Objects.search.clean(sql)
+        sql.commit()
+        return changed
 
-        for genre_id in genre_ids:
-            Objects.albums.add_genre(album_id, genre_id, outside, sql)
+    """
+        Get tags for files, from tag cache if file didn't change,
+        others are read in workers and cached
+        @param filepaths as [str]
+        @param stats as {filepath as str: (mtime as int, size as int,
+                                           inode as int)}
+        @return generator of (filepath as str,
+                              tags as TagReader.get_tags() or None)
+        @thread safe
+    """
+    def _get_tags(self, filepaths, stats):
+        cache = self._tagcache.get_cursor()
+        cached = self._tagcache.get(stats, cache)
+        to_read = []
+        entries = []
+        try:
+            for filepath in filepaths:
+                if filepath in cached:
+                    yield (filepath, cached[filepath])
+                else:
+                    to_read.append(filepath)
+            pool = TagReaderPool(Objects.settings.get_value(
+                                            'scan-workers').get_int32())
+            for (filepath, tags) in pool.get_infos(to_read):
+                if tags is not None:
+                    (mtime, size, inode) = stats[filepath]
+                    entries.append((filepath, mtime, size, tags))
+                    if len(entries) >= self._BATCH_SIZE:
+                        self._tagcache.set(entries, cache)
+                        entries = []
+                yield (filepath, tags)
+        finally:
+            self._tagcache.set(entries, cache)
+            if cache is not None:
+                cache.close()
 
-        # Now we have our album id, check if path doesn't change
-        if Objects.albums.get_path(album_id, sql) != path and not outside:
-            Objects.albums.set_path(album_id, path, sql)
+    """
+        Get tags for file, from tag cache if file didn't change
+        @param filepath as str
+        @param cache as sqlite cursor
+        @return tags as TagReader.get_tags() or None
+        @thread safe
+    """
+    def _get_file_tags(self, filepath, cache):
+        try:
+            st = os.stat(filepath)
+        except OSError as e:
+            debug("CollectionScanner::_get_file_tags(): %s" % e)
+            return None
+        stats = {filepath: (int(st.st_mtime), st.st_size, st.st_ino)}
+        tags = self._tagcache.get(stats, cache).get(filepath)
+        if tags is None:
+            tags = Objects.player.read_tags(filepath)
+            if tags is not None:
+                self._tagcache.set([(filepath, stats[filepath][0],
+                                     st.st_size, tags)], cache)
+        return tags
 
-        # Add track to db
-        Objects.tracks.add(title, filepath, length,
-                           tracknumber, discnumber,
-                           album_id, year, mtime, outside, sql)
-
-        # Update year for album
-        year = Objects.albums.get_year_from_tracks(album_id, sql)
-        Objects.albums.set_year(album_id, year, sql)
-
-        # Set artists/genres for track
-        track_id = Objects.tracks.get_id_by_path(filepath, sql)
-        for artist_id in artist_ids:
-            Objects.tracks.add_artist(track_id, artist_id, outside, sql)
-        for genre_id in genre_ids:
-            Objects.tracks.add_genre(track_id, genre_id, outside, sql)
-        # Notify about new artists/genres
-        if self._new_genres or self._new_artists:
+    """
+        Check if file needs to be read
+        @param filepath as str
+        @param stat as (mtime as int, size as int, inode as int)
+        @param known as stat stored in db or None if file is unknown
+        @param backfill as [(size as int, inode as int, filepath as str)],
+               filled with stats missing in db
+        @param modified as set of str, filled with outdated tracks in db
+        @return True if file needs to be read
+        @thread safe
+    """
+    def _need_read(self, filepath, stat, known, backfill, modified):
+        if known is None:
+            if is_audio(Gio.File.new_for_path(filepath)):
+                return True
+            debug("%s not detected as a music file" % filepath)
+            return False
+        (mtime, size, inode) = known
+        if mtime == stat[0] and\
+           size in [None, stat[1]] and\
+           inode in [None, stat[2]]:
+            # Written before size/inode were stored
+            if size is None:
+                backfill.append((stat[1], stat[2], filepath))
+            return False
+        # Update tags by removing song and readd it
+        modified.add(filepath)
+        return True
+
+    """
+        Store missing stats, then commit,
+        so no write transaction is left open while reading tags
+        @param backfill as [(size as int, inode as int, filepath as str)]
+        @param sql as sqlite cursor
+    """
+    def _write_stats(self, backfill, sql):
+        try:
+            Objects.tracks.set_stats(backfill, sql)
             sql.commit()
-            for genre_id in self._new_genres:
-                GLib.idle_add(self.emit, "genre-update", genre_id)
-            for artist_id in self._new_artists:
-                GLib.idle_add(self.emit, "artist-update", artist_id, album_id)
-        return track_id
+        except Exception as e:
+            sql.rollback()
+            print("CollectionScanner::_write_stats(): %s" % e)
+
+    """
+        Write tracks buffered in writer, notify about new artists/genres
+        @param writer as CollectionWriter
+        @param dir_mtimes as {path as str: mtime as int}, directories of
+               files in a failed write are set to 0, so listed again
+        @return {filepath as str: track id as int} or None on failure
+    """
+    def _flush(self, writer, dir_mtimes=None):
+        filepaths = writer.get_filepaths()
+        try:
+            (track_ids, new_genres, new_artists) = writer.flush()
+        except Exception as e:
+            print("CollectionScanner::_flush(): %s" % e)
+            if dir_mtimes is not None:
+                for filepath in filepaths:
+                    dir_mtimes[os.path.dirname(filepath)] = 0
+            return None
+        for genre_id in new_genres:
+            GLib.idle_add(self.emit, "genre-update", genre_id)
+        for (artist_id, album_id) in new_artists:
+            GLib.idle_add(self.emit, "artist-update", artist_id, album_id)
+        return track_ids
 
     """
         Restore albums popularties
@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, Gio
+
+from _thread import start_new_thread
+import os
+
+from lollypop.utils import debug
+
+
+# Watch music paths for changes and send changed paths to scanner
+# One directory monitor per directory, events are grouped before scanning
+class CollectionWatcher:
+    # Wait for events to settle before scanning, in ms
+    _DELAY = 2000
+    # Events handled, others are ignored
+    _EVENTS = [Gio.FileMonitorEvent.CREATED,
+               Gio.FileMonitorEvent.DELETED,
+               Gio.FileMonitorEvent.CHANGES_DONE_HINT]
+
+    """
+        Init watcher
+        @param scanner as CollectionScanner
+    """
+    def __init__(self, scanner):
+        self._scanner = scanner
+        self._monitors = {}
+        self._pending = set()
+        self._timeout_id = None
+        self._running = False
+        scanner.connect("update-cancelled", self._on_update_cancelled)
+
+    """
+        Start watching music paths
+    """
+    def start(self):
+        self.stop()
+        self._running = True
+        paths = self._scanner.get_music_paths()
+        start_new_thread(self._watch, (paths,))
+
+    """
+        Stop watching, pending changes are dropped
+    """
+    def stop(self):
+        self._running = False
+        for monitor in self._monitors.values():
+            monitor.cancel()
+        self._monitors = {}
+        self._pending = set()
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+
+    """
+        True if watching
+        @return bool
+    """
+    def is_running(self):
+        return self._running
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Get directories under paths, monitor them in main loop
+        @param paths as [str]
+        @thread safe
+    """
+    def _watch(self, paths):
+        dirs = []
+        for path in paths:
+            dirs += self._get_dirs(path)
+        GLib.idle_add(self._add_monitors, dirs)
+
+    """
+        Return path and its sub directories, symlinks are not followed
+        @param path as str
+        @return [str]
+        @thread safe
+    """
+    def _get_dirs(self, path):
+        dirs = []
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            dirs.append(path)
+            try:
+                for entry in os.scandir(path):
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+            except OSError as e:
+                debug("CollectionWatcher::_get_dirs(): %s" % e)
+        return dirs
+
+    """
+        Monitor directories
+        @param dirs as [str]
+    """
+    def _add_monitors(self, dirs):
+        if not self._running:
+            return
+        for path in dirs:
+            if path in self._monitors:
+                continue
+            try:
+                f = Gio.File.new_for_path(path)
+                monitor = f.monitor_directory(Gio.FileMonitorFlags.NONE,
+                                              None)
+                monitor.connect('changed', self._on_changed)
+                self._monitors[path] = monitor
+            except Exception as e:
+                print("CollectionWatcher::_add_monitors(): %s" % e)
+
+    """
+        Stop monitoring path and its sub directories
+        @param path as str
+    """
+    def _remove_monitors(self, path):
+        prefix = path + os.sep
+        for key in list(self._monitors.keys()):
+            if key == path or key.startswith(prefix):
+                self._monitors.pop(key).cancel()
+
+    """
+        Queue changed path, monitor new directories
+        @param monitor as Gio.FileMonitor
+        @param f as Gio.File
+        @param other as Gio.File
+        @param event as Gio.FileMonitorEvent
+    """
+    def _on_changed(self, monitor, f, other, event):
+        if event not in self._EVENTS:
+            return
+        path = f.get_path()
+        if path is None:
+            return
+        if event == Gio.FileMonitorEvent.CREATED:
+            if os.path.isdir(path) and not os.path.islink(path):
+                start_new_thread(self._watch, ([path],))
+        elif event == Gio.FileMonitorEvent.DELETED:
+            self._remove_monitors(path)
+        debug("CollectionWatcher::_on_changed(): %s %s" % (event, path))
+        self._queue([path])
+
+    """
+        Queue paths again, scanner stopped before writing them
+        @param scanner as CollectionScanner
+        @param paths as [str]
+    """
+    def _on_update_cancelled(self, scanner, paths):
+        if self._running and paths:
+            self._queue(paths)
+
+    """
+        Queue paths, scan them when events settled
+        @param paths as [str]
+    """
+    def _queue(self, paths):
+        self._pending |= set(paths)
+        # Wait for events to settle
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+        self._timeout_id = GLib.timeout_add(self._DELAY, self._on_timeout)
+
+    """
+        Send pending paths to scanner, retry later if scanner is busy
+        @return True to retry
+    """
+    def _on_timeout(self):
+        if self._scanner.is_locked():
+            return True
+        self._timeout_id = None
+        paths = list(self._pending)
+        self._pending = set()
+        self._scanner.update_paths(paths)
+        return False
@@ -0,0 +1,251 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from time import time
+
+from lollypop.define import Objects, Navigation
+from lollypop.utils import format_artist_name
+
+
+# Buffer tracks and write them to db in large transactions
+# Artists, genres and albums ids are kept in memory
+# Only one writer should exist at a time
+class CollectionWriter:
+    """
+        Init writer
+        @param outside as bool
+        @param is_empty as bool, True if db was empty on scan
+        @param sql as sqlite cursor
+    """
+    def __init__(self, outside, is_empty, sql):
+        self._outside = outside
+        self._is_empty = is_empty
+        self._sql = sql
+        self._load_ids()
+        # Albums needing a year update
+        self._albums = set()
+        # Albums which lost tracks
+        self._removed_albums = set()
+        self._reset()
+
+    """
+        Add a track, nothing is written before flush()
+        @param filepath as str
+        @param mtime as int
+        @param tags as TagReader.get_tags()
+        @param size as int
+        @param inode as int
+    """
+    def add(self, filepath, mtime, tags, size=None, inode=None):
+        (title, artists, aartist, album, genres,
+         discnumber, tracknumber, year, length) = tags
+        # Invalid encoding in filenames may raise an exception
+        try:
+            filepath.encode('utf-8')
+        except Exception as e:
+            print("CollectionWriter::add: ", e, ascii(filepath))
+            return
+
+        if aartist:
+            aartist = format_artist_name(aartist)
+
+        # Get all artist ids, add missing ones
+        artist_ids = []
+        for word in artists.split(';'):
+            artist = format_artist_name(word)
+            artist_id = self._artist_ids.get(artist)
+            if artist_id is None:
+                artist_id = Objects.artists.add(artist, self._outside,
+                                                self._sql)
+                self._artist_ids[artist] = artist_id
+                if artist == aartist:
+                    self._new_artists.append(artist_id)
+            if artist_id not in artist_ids:
+                artist_ids.append(artist_id)
+
+        if aartist:
+            aartist_id = self._artist_ids.get(aartist)
+            if aartist_id is None:
+                aartist_id = Objects.artists.add(aartist, self._outside,
+                                                 self._sql)
+                self._artist_ids[aartist] = aartist_id
+                self._new_artists.append(aartist_id)
+        else:
+            aartist_id = Navigation.COMPILATIONS
+
+        # Get all genre ids, add missing ones
+        genre_ids = []
+        for genre in genres.split(';'):
+            genre_id = self._genre_ids.get(genre)
+            if genre_id is None:
+                genre_id = Objects.genres.add(genre, self._outside, self._sql)
+                self._genre_ids[genre] = genre_id
+                self._new_genres.append(genre_id)
+            if genre_id not in genre_ids:
+                genre_ids.append(genre_id)
+
+        path = os.path.dirname(filepath)
+        album_id = self._album_ids.get((album, aartist_id))
+        if album_id is None:
+            # If db was empty on scan,
+            # use file modification time to get recents
+            if self._is_empty:
+                album_mtime = mtime
+            # Use current time
+            else:
+                album_mtime = int(time())
+            album_id = Objects.albums.add(album, aartist_id, path, 0,
+                                          self._outside, album_mtime,
+                                          self._sql)
+            self._album_ids[(album, aartist_id)] = album_id
+        # Check if path doesn't change
+        elif not self._outside:
+            self._album_paths[album_id] = path
+
+        for genre_id in genre_ids:
+            self._album_genres.add((album_id, genre_id, self._outside))
+        # First album seen for new artists, needed by artist-update signal
+        for artist_id in self._new_artists:
+            if artist_id not in self._new_artists_albums:
+                self._new_artists_albums[artist_id] = album_id
+
+        self._albums.add(album_id)
+        self._tracks.append((title, filepath, length, tracknumber,
+                             discnumber, album_id, year, mtime,
+                             self._outside, size, inode))
+        self._track_artists[filepath] = artist_ids
+        self._track_genres[filepath] = genre_ids
+
+    """
+        Remove a track, nothing is written before flush()
+        Track is removed in same transaction as added tracks,
+        so an outdated track is kept until its update is written
+        @param filepath as str
+    """
+    def remove(self, filepath):
+        self._removed.append(filepath)
+
+    """
+        Return buffered files, added and removed
+        @return [str]
+    """
+    def get_filepaths(self):
+        return [track[1] for track in self._tracks] + self._removed
+
+    """
+        Return number of buffered tracks
+        @return int
+    """
+    def count(self):
+        return len(self._tracks)
+
+    """
+        Write buffered tracks, remove buffered removed tracks and commit
+        Buffers are cleared even on failure, failed tracks are lost,
+        removed tracks are kept
+        @return ({filepath as str: track id as int},
+                 new genre ids as [int],
+                 new artist ids as [(artist id as int, album id as int)])
+        @raise sqlite3.Error, transaction is rolled back
+    """
+    def flush(self):
+        try:
+            removed_albums = set()
+            if self._removed:
+                removed_albums = Objects.tracks.remove_many(self._removed,
+                                                            self._sql)
+            Objects.tracks.add_many(self._tracks, self._sql)
+            track_ids = Objects.tracks.get_ids_by_path(
+                                        list(self._track_artists.keys()),
+                                        self._sql)
+            track_artists = []
+            track_genres = []
+            for filepath, track_id in track_ids.items():
+                for artist_id in self._track_artists[filepath]:
+                    track_artists.append((track_id, artist_id,
+                                          self._outside))
+                for genre_id in self._track_genres[filepath]:
+                    track_genres.append((track_id, genre_id, self._outside))
+            Objects.tracks.add_artists(track_artists, self._sql)
+            Objects.tracks.add_genres(track_genres, self._sql)
+            Objects.albums.add_genres(list(self._album_genres), self._sql)
+            Objects.albums.set_paths([(path, album_id) for (album_id, path)
+                                      in self._album_paths.items()],
+                                     self._sql)
+            self._sql.commit()
+            self._albums |= removed_albums
+            self._removed_albums |= removed_albums
+            new_artists = []
+            for artist_id in self._new_artists:
+                new_artists.append((artist_id,
+                                    self._new_artists_albums[artist_id]))
+            return (track_ids, self._new_genres, new_artists)
+        except:
+            self._sql.rollback()
+            # Artists, genres and albums added since last commit are gone
+            self._load_ids()
+            self._albums &= set(self._album_ids.values())
+            raise
+        finally:
+            self._reset()
+
+    """
+        Return albums touched by this writer since last update_years()
+        @return set of album ids as int
+    """
+    def get_album_ids(self):
+        return set(self._albums)
+
+    """
+        Return albums which lost tracks removed by this writer
+        @return set of album ids as int
+    """
+    def get_removed_album_ids(self):
+        return set(self._removed_albums)
+
+    """
+        Update year for albums touched by this writer
+        Use most used year by tracks
+        @warning: commit needed
+    """
+    def update_years(self):
+        for album_id in self._albums:
+            year = Objects.albums.get_year_from_tracks(album_id, self._sql)
+            Objects.albums.set_year(album_id, year, self._sql)
+        self._albums = set()
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Load artists, genres and albums ids from db
+    """
+    def _load_ids(self):
+        self._artist_ids = Objects.artists.get_ids_by_name(self._sql)
+        self._genre_ids = Objects.genres.get_ids_by_name(self._sql)
+        self._album_ids = Objects.albums.get_ids_by_name(self._sql)
+
+    """
+        Clear buffers
+    """
+    def _reset(self):
+        self._tracks = []
+        self._removed = []
+        self._track_artists = {}
+        self._track_genres = {}
+        self._album_genres = set()
+        self._album_paths = {}
+        self._new_artists = []
+        self._new_artists_albums = {}
+        self._new_genres = []
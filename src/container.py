@@ -26,6 +26,7 @@ from lollypop.view_playlists import PlaylistView
 from lollypop.view_playlists import PlaylistManageView, PlaylistEditView
 from lollypop.view_device import DeviceView
 from lollypop.collectionscanner import CollectionScanner
+from lollypop.collectionwatcher import CollectionWatcher
 
 
 # This is a multimedia device
@@ -166,6 +167,7 @@ class Container:
     """
     def stop_all(self):
         self._scanner.stop()
+        self._watcher.stop()
         view = self._stack.get_visible_child()
         if view is not None:
             self._stack.clean_old_views(None)
@@ -288,9 +290,16 @@ class Container:
     def _setup_scanner(self):
         self._scanner = CollectionScanner(self._progress)
         self._scanner.connect("scan-finished", self._on_scan_finished)
+        self._scanner.connect("scan-finished", Objects.player.on_scan_finished)
         self._scanner.connect("genre-update", self._add_genre)
         self._scanner.connect("artist-update", self._add_artist)
         self._scanner.connect("added", self._play_track)
+        self._watcher = CollectionWatcher(self._scanner)
+        Objects.settings.connect('changed::watch-collection',
+                                 self._on_watch_changed)
+        Objects.settings.connect('changed::music-path',
+                                 self._on_watch_changed)
+        self._on_watch_changed()
 
     """
         Update list one
@@ -590,6 +599,16 @@ class Container:
         else:
             self.update_lists(scanner)
 
+    """
+        Start/stop collection watcher
+        @param settings as Gio.Settings, value as str
+    """
+    def _on_watch_changed(self, settings=None, value=None):
+        if Objects.settings.get_value('watch-collection'):
+            self._watcher.start()
+        else:
+            self._watcher.stop()
+
     """
         On volume mounter
         @param vm as Gio.VolumeMonitor
@@ -13,9 +13,22 @@
 
 import sqlite3
 import os
-from gi.repository import GLib
+from threading import Lock
 
 from lollypop.define import Objects
+from lollypop.database_upgrade import DatabaseUpgrade
+
+
+# Connection returned to database pool on close
+class SqlConnection(sqlite3.Connection):
+    """
+        Release connection, uncommitted changes are lost
+    """
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        self.row_factory = None
+        self.db.release_cursor(self)
 
 
 class Database:
@@ -66,7 +79,16 @@ class Database:
                                                 track_id INT NOT NULL,
                                                 genre_id INT NOT NULL,
                                                 outside BOOLEAN NOT NULL)'''
-    version = 7
+    # Schema above is version 7, newer versions come from DatabaseUpgrade
+    # Older databases are reset, popularities and mtimes are restored
+    reset_version = 7
+    # Idle connections kept open
+    _POOL_SIZE = 8
+    # Per connection pragmas
+    _PRAGMAS = ["PRAGMA synchronous=NORMAL",
+                "PRAGMA temp_store=MEMORY",
+                "PRAGMA cache_size=-8192",
+                "PRAGMA mmap_size=134217728"]
 
     """
         Create database tables or manage update if needed
@@ -74,6 +96,8 @@ class Database:
     def __init__(self):
         self._popularity_backup = {}
         self._mtime_backup = {}
+        self._pool = []
+        self._pool_lock = Lock()
         # Create db directory if missing
         if not os.path.exists(self.LOCAL_PATH):
             try:
@@ -83,28 +107,41 @@ class Database:
 
         if os.path.exists(self.DB_PATH):
             db_version = Objects.settings.get_value('db-version').get_int32()
-            if db_version < self.version:
+            if db_version < self.reset_version:
                 self._set_popularities()
                 self._set_mtimes()
-                os.remove(self.DB_PATH)
-                Objects.settings.set_value('db-version',
-                                           GLib.Variant('i', self.version))
+                self._close_pool()
+                # Remove WAL files too, they would be replayed on new db
+                for suffix in ["", "-wal", "-shm"]:
+                    if os.path.exists(self.DB_PATH + suffix):
+                        os.remove(self.DB_PATH + suffix)
+        else:
+            db_version = 0
 
         sql = self.get_cursor()
-        # Create db schema
+        # Readers don't wait for writers, persistent in db file
         try:
-            sql.execute(self.create_albums)
-            sql.execute(self.create_artists)
-            sql.execute(self.create_genres)
-            sql.execute(self.create_album_genres)
-            sql.execute(self.create_tracks)
-            sql.execute(self.create_track_artists)
-            sql.execute(self.create_track_genres)
-            sql.commit()
-            Objects.settings.set_value('db-version',
-                                       GLib.Variant('i', self.version))
-        except:
-            pass
+            sql.execute("PRAGMA journal_mode=WAL")
+        except Exception as e:
+            print("Database::__init__: %s" % e)
+        # Create db schema
+        if db_version < self.reset_version:
+            try:
+                sql.execute(self.create_albums)
+                sql.execute(self.create_artists)
+                sql.execute(self.create_genres)
+                sql.execute(self.create_album_genres)
+                sql.execute(self.create_tracks)
+                sql.execute(self.create_track_artists)
+                sql.execute(self.create_track_genres)
+                sql.commit()
+                db_version = self.reset_version
+            except Exception as e:
+                print("Database::__init__: %s" % e)
+        # Upgrade schema in place
+        upgrade = DatabaseUpgrade(db_version)
+        upgrade.do_db_upgrade(sql)
+        sql.close()
 
     """
         Get a dict with album path and popularity
@@ -125,6 +162,15 @@ class Database:
 # Private #
 ###########
 
+    """
+        Close idle cursors
+    """
+    def _close_pool(self):
+        with self._pool_lock:
+            for sql in self._pool:
+                sqlite3.Connection.close(sql)
+            self._pool = []
+
     """
         Set a dict with album string and popularity
         This is usefull for collection scanner be
@@ -162,10 +208,32 @@ class Database:
             print("Database::_set_mtimes: %s" % e)
 
     """
-        Return a new sqlite cursor
+        Return a sqlite cursor, reuse an idle one if possible
+        Cursor can be used in any thread, but by one thread at a time,
+        close() gives it back
     """
     def get_cursor(self):
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop()
         try:
-            return sqlite3.connect(self.DB_PATH)
+            sql = sqlite3.connect(self.DB_PATH,
+                                  check_same_thread=False,
+                                  factory=SqlConnection)
+            sql.db = self
+            for pragma in self._PRAGMAS:
+                sql.execute(pragma)
+            return sql
         except:
             exit(-1)
+
+    """
+        Put cursor back in pool, close it if pool is full
+        @param sql as SqlConnection
+    """
+    def release_cursor(self, sql):
+        with self._pool_lock:
+            if len(self._pool) < self._POOL_SIZE and sql not in self._pool:
+                self._pool.append(sql)
+                return
+        sqlite3.Connection.close(sql)
@@ -29,16 +29,19 @@ class DatabaseAlbums:
         @param path as string
         @param outside as bool
         @param mtime as int
+        @return Album id as int
         @warning: commit needed
     """
     def add(self, name, artist_id, path, popularity,
             outside, mtime, sql=None):
         if not sql:
             sql = Objects.sql
-        sql.execute("INSERT INTO albums "
-                    "(name, artist_id, path, popularity, outside, mtime)"
-                    "VALUES (?, ?, ?, ?, ?, ?)",
-                    (name, artist_id, path, popularity, outside, mtime))
+        result = sql.execute("INSERT INTO albums "
+                             "(name, artist_id, path, popularity, outside,"
+                             " mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                             (name, artist_id, path, popularity,
+                              outside, mtime))
+        return result.lastrowid
 
     """
         Add genre to album
@@ -56,6 +59,31 @@ class DatabaseAlbums:
                         "album_genres (album_id, genre_id, outside)"
                         "VALUES (?, ?, ?)", (album_id, genre_id, outside))
 
+    """
+        Add genres to albums, existing ones are ignored
+        @param [(album id as int, genre id as int, outside as bool)]
+        @warning: commit needed
+    """
+    def add_genres(self, album_genres, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.executemany("INSERT INTO album_genres (album_id, genre_id, outside)\
+                         SELECT ?1, ?2, ?3 WHERE NOT EXISTS\
+                            (SELECT rowid FROM album_genres\
+                             WHERE album_id=?1 AND genre_id=?2)",
+                        album_genres)
+
+    """
+        Set paths
+        @param [(path as string, album id as int)]
+        @warning: commit needed
+    """
+    def set_paths(self, paths, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.executemany("UPDATE albums SET path=?1\
+                         WHERE rowid=?2 AND path!=?1", paths)
+
     """
         Set artist id
         @param album id as int, artist_id as int
@@ -180,6 +208,19 @@ class DatabaseAlbums:
             return v[0]
         return None
 
+    """
+        Get all album ids
+        @return {(Album name as string, artist id as int): Album id as int}
+    """
+    def get_ids_by_name(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        albums = {}
+        result = sql.execute("SELECT name, artist_id, rowid FROM albums")
+        for (name, artist_id, album_id) in result:
+            albums[(name, artist_id)] = album_id
+        return albums
+
     """
         Get genre ids
         @param Album id as int
@@ -246,6 +287,32 @@ class DatabaseAlbums:
 
         return _("Compilation")
 
+    """
+        Get album and artist names for albums
+        @param album ids as [int]
+        @return {album id as int: (album name as string,
+                                   artist name as string)}
+    """
+    def get_names(self, album_ids, sql=None):
+        if not sql:
+            sql = Objects.sql
+        names = {}
+        album_ids = list(album_ids)
+        for i in range(0, len(album_ids), 500):
+            chunk = album_ids[i:i+500]
+            result = sql.execute("SELECT albums.rowid, albums.name,\
+                                  artists.name\
+                                  FROM albums LEFT JOIN artists\
+                                  ON albums.artist_id=artists.rowid\
+                                  WHERE albums.rowid IN (%s)" %
+                                 ",".join("?" * len(chunk)), chunk)
+            for row in result:
+                if row[2] is None:
+                    names[row[0]] = (row[1], _("Compilation"))
+                else:
+                    names[row[0]] = (row[1], row[2])
+        return names
+
     """
         Get album artist id
         @param album_id
@@ -377,13 +444,28 @@ class DatabaseAlbums:
         albums = []
         # get popular first
         if -1 in genre_ids:
-            albums = self.get_populars()
+            albums = self.get_populars(sql)
+        added = set(albums)
         for genre_id in genre_ids:
             for album in Objects.genres.get_albums(genre_id, sql):
-                if album not in albums:
+                if album not in added:
+                    added.add(album)
                     albums.append(album)
         return albums
 
+    """
+        Get popularity and mtime for all albums
+        @return {album id as int: (popularity as int, mtime as int)}
+    """
+    def get_popularities(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        popularities = {}
+        result = sql.execute("SELECT rowid, popularity, mtime FROM albums")
+        for row in result:
+            popularities[row[0]] = (row[1], row[2] or 0)
+        return popularities
+
     """
         Get number of tracks for album_id
         @param album id as int
@@ -534,45 +616,108 @@ class DatabaseAlbums:
                            length as int, [artist ids])
     """
     def get_tracks_infos(self, album_id, genre_id, disc, sql=None):
-        if not sql:
-            sql = Objects.sql
-
-        if genre_id is not None and genre_id > 0:
-            result = sql.execute("SELECT tracks.rowid,\
-                                  tracks.name,\
-                                  tracks.length\
-                                  FROM tracks, albums,\
-                                  track_artists, track_genres\
-                                  WHERE albums.rowid=?\
-                                  AND albums.rowid = tracks.album_id\
-                                  AND tracks.rowid = track_artists.track_id\
-                                  AND tracks.rowid = track_genres.track_id\
-                                  AND track_genres.genre_id=?\
-                                  AND discnumber=?\
-                                  ORDER BY discnumber, tracknumber",
-                                 (album_id, genre_id, disc))
-        else:
-            result = sql.execute("SELECT tracks.rowid,\
-                                  tracks.name,\
-                                  tracks.length\
-                                  FROM tracks, track_artists, albums\
-                                  WHERE albums.rowid = ?\
-                                  AND albums.rowid = tracks.album_id\
-                                  AND track_artists.track_id = tracks.rowid\
-                                  AND discnumber=?\
-                                  ORDER BY discnumber, tracknumber",
-                                 (album_id, disc))
+        for (album_disc, tracks) in self.get_discs_tracks([album_id],
+                                                          genre_id,
+                                                          sql).get(album_id,
+                                                                   []):
+            if album_disc == disc:
+                return tracks
+        return []
+
+    """
+        Get tracks informations for albums, grouped by disc
+        Tracks and their artists are loaded in one request
+        @param album ids as [int]
+        @param genre id as int
+        @return {album id as int: [(disc number as int,
+                 [(track id as int, name as string,
+                   length as int, [artist ids])])]}
+    """
+    def get_discs_tracks(self, album_ids, genre_id, sql=None):
+        if not sql:
+            sql = Objects.sql
+        albums = {}
+        album_ids = list(album_ids)
+        for i in range(0, len(album_ids), 500):
+            chunk = album_ids[i:i+500]
+            filters = ",".join("?" * len(chunk))
+            if genre_id is not None and genre_id > 0:
+                result = sql.execute("SELECT tracks.album_id,\
+                                      tracks.discnumber,\
+                                      tracks.rowid,\
+                                      tracks.name,\
+                                      tracks.length,\
+                                      (SELECT GROUP_CONCAT(artist_id)\
+                                       FROM track_artists\
+                                       WHERE track_id=tracks.rowid)\
+                                      FROM tracks, track_genres\
+                                      WHERE tracks.album_id IN (%s)\
+                                      AND track_genres.track_id=tracks.rowid\
+                                      AND track_genres.genre_id=?\
+                                      ORDER BY discnumber, tracknumber" %
+                                     filters, chunk + [genre_id])
+            else:
+                result = sql.execute("SELECT tracks.album_id,\
+                                      tracks.discnumber,\
+                                      tracks.rowid,\
+                                      tracks.name,\
+                                      tracks.length,\
+                                      (SELECT GROUP_CONCAT(artist_id)\
+                                       FROM track_artists\
+                                       WHERE track_id=tracks.rowid)\
+                                      FROM tracks\
+                                      WHERE tracks.album_id IN (%s)\
+                                      ORDER BY discnumber, tracknumber" %
+                                     filters, chunk)
+            for row in result:
+                # Tracks without artist are not shown
+                if row[5] is None:
+                    continue
+                artist_ids = [int(artist_id)
+                              for artist_id in row[5].split(',')]
+                discs = albums.setdefault(row[0], [])
+                if not discs or discs[-1][0] != row[1]:
+                    discs.append((row[1], []))
+                discs[-1][1].append((row[2], row[3], row[4], artist_ids))
+        return albums
 
-        infos = []
-        rm_doublon = []
-        for row in result:
-            # Check for doublon
-            if row[0] not in rm_doublon:
-                rm_doublon.append(row[0])
-                # Add artists
-                row += (Objects.tracks.get_artist_ids(row[0], sql),)
-                infos.append(row,)
-        del rm_doublon
+    """
+        Get albums informations for detailed album widgets
+        @param album ids as [int]
+        @param genre id as int
+        @return {album id as int: (name as string, year as string,
+                 artist id as int, popularity as int,
+                 avg popularity as int,
+                 discs as get_discs_tracks() value,
+                 tracks artists names as {artist id as int: name as string})}
+    """
+    def get_detailed_infos(self, album_ids, genre_id, sql=None):
+        if not sql:
+            sql = Objects.sql
+        album_ids = list(album_ids)
+        discs = self.get_discs_tracks(album_ids, genre_id, sql)
+        artist_ids = set()
+        for album_discs in discs.values():
+            for (disc, tracks) in album_discs:
+                for track in tracks:
+                    artist_ids.update(track[3])
+        artist_names = Objects.artists.get_names(artist_ids, sql)
+        avg_popularity = self.get_avg_popularity(sql)
+        infos = {}
+        for i in range(0, len(album_ids), 500):
+            chunk = album_ids[i:i+500]
+            result = sql.execute("SELECT rowid, name, year, artist_id,\
+                                  popularity\
+                                  FROM albums WHERE rowid IN (%s)" %
+                                 ",".join("?" * len(chunk)), chunk)
+            for row in result:
+                if row[2]:
+                    year = str(row[2])
+                else:
+                    year = ""
+                infos[row[0]] = (row[1], year, row[3], row[4],
+                                 avg_popularity, discs.get(row[0], []),
+                                 artist_names)
         return infos
 
     """
@@ -672,6 +817,7 @@ class DatabaseAlbums:
         Search for compilations, after scan some albums marked
         as compilation (no artist album)
         can be albums => all tracks are from the same artist
+        Search index is updated for changed albums
         @param outside as bool
         @warning commit needed
     """
@@ -688,7 +834,8 @@ class DatabaseAlbums:
                               HAVING COUNT(DISTINCT track_artists.artist_id)\
                               == 1", (Navigation.COMPILATIONS,))
 
-        for artist_id, album_id, album_name, in result:
+        album_ids = set()
+        for artist_id, album_id, album_name, in result.fetchall():
             existing_id = self.get_id(album_name, artist_id, sql)
             # Some tracks from album have an album artist and some not
             if existing_id is not None and existing_id != album_id:
@@ -698,11 +845,14 @@ class DatabaseAlbums:
                     self.add_genre(existing_id, genre_id, outside, sql)
                 sql.execute("DELETE FROM albums WHERE rowid = ?",
                             (album_id,))
+                album_ids.add(existing_id)
             # Album is not a compilation,
             # so update album id to march track album id
             else:
                 sql.execute("UPDATE albums SET artist_id=? WHERE rowid=?",
                             (artist_id, album_id))
+            album_ids.add(album_id)
+        Objects.search.update_albums(album_ids, sql)
 
     """
         Search for albums looking like string
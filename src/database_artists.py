@@ -25,13 +25,15 @@ class DatabaseArtists:
     """
         Add a new artist to database
         @param Artist name as string
+        @return Artist id as int
         @warning: commit needed
     """
     def add(self, name, outside, sql=None):
         if not sql:
             sql = Objects.sql
-        sql.execute("INSERT INTO artists (name, outside) VALUES (?, ?)",
-                    (name, outside))
+        result = sql.execute("INSERT INTO artists (name, outside)\
+                              VALUES (?, ?)", (name, outside))
+        return result.lastrowid
 
     """
         Get artist id
@@ -50,6 +52,19 @@ class DatabaseArtists:
 
         return None
 
+    """
+        Get all artist ids
+        @return {Artist name as string: Artist id as int}
+    """
+    def get_ids_by_name(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        artists = {}
+        result = sql.execute("SELECT name, rowid FROM artists")
+        for (name, artist_id) in result:
+            artists[name] = artist_id
+        return artists
+
     """
         Get artist name
         @param Artist id as int
@@ -69,6 +84,30 @@ class DatabaseArtists:
 
         return _("Unknown")
 
+    """
+        Get artists names
+        @param artist ids as [int]
+        @return {artist id as int: name as string}
+    """
+    def get_names(self, artist_ids, sql=None):
+        if not sql:
+            sql = Objects.sql
+        names = {}
+        artist_ids = list(artist_ids)
+        for i in range(0, len(artist_ids), 500):
+            chunk = artist_ids[i:i+500]
+            result = sql.execute("SELECT rowid, name FROM artists\
+                                  WHERE rowid IN (%s)" %
+                                 ",".join("?" * len(chunk)), chunk)
+            for row in result:
+                names[row[0]] = row[1]
+        for artist_id in artist_ids:
+            if artist_id == Navigation.COMPILATIONS:
+                names[artist_id] = _("Many artists")
+            elif artist_id not in names:
+                names[artist_id] = _("Unknown")
+        return names
+
     """
         Get all availables albums  for artist
         @return Array of id as int
@@ -26,13 +26,15 @@ class DatabaseGenres:
         Add a new genre to database
         @param Name as string
         @param outside as bool
+        @return genre id as int
         @warning: commit needed
     """
     def add(self, name, outside, sql=None):
         if not sql:
             sql = Objects.sql
-        sql.execute("INSERT INTO genres (name, outside) VALUES (?, ?)",
-                    (name, outside))
+        result = sql.execute("INSERT INTO genres (name, outside)\
+                              VALUES (?, ?)", (name, outside))
+        return result.lastrowid
 
     """
         Get genre id for name
@@ -50,6 +52,19 @@ class DatabaseGenres:
 
         return None
 
+    """
+        Get all genre ids
+        @return {name as string: genre id as int}
+    """
+    def get_ids_by_name(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        genres = {}
+        result = sql.execute("SELECT name, rowid FROM genres")
+        for (name, genre_id) in result:
+            genres[name] = genre_id
+        return genres
+
     """
         Get genre name for genre id
         @param string
@@ -0,0 +1,219 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from lollypop.define import Objects
+
+
+# Full text search index over albums and tracks
+# Index rowid is track id for tracks and -album id for albums
+# Albums are indexed with album name and album artist,
+# tracks with track name and artists not being album artist
+# Without FTS5 support, search falls back to LIKE requests
+class DatabaseSearch:
+    # Index content for albums and tracks, filtered by WHERE clause
+    _ALBUMS = "INSERT INTO search(rowid, name, artists)\
+               SELECT -albums.rowid, albums.name, IFNULL(artists.name, '')\
+               FROM albums LEFT JOIN artists\
+               ON artists.rowid = albums.artist_id %s"
+    _TRACKS = "INSERT INTO search(rowid, name, artists)\
+               SELECT tracks.rowid, tracks.name,\
+               IFNULL((SELECT GROUP_CONCAT(artists.name, ' ')\
+                       FROM track_artists, artists\
+                       WHERE track_artists.track_id = tracks.rowid\
+                       AND artists.rowid = track_artists.artist_id\
+                       AND artists.rowid != albums.artist_id), '')\
+               FROM tracks, albums\
+               WHERE albums.rowid = tracks.album_id %s"
+    # First results chunk is small to be shown at once
+    _FIRST_CHUNK = 10
+    _CHUNK = 50
+    # Results for matches as (id, rank), albums first on equal rank
+    _RESULTS = "WITH matches(id, rank) AS (%s)\
+                SELECT matches.id, albums.rowid, albums.name,\
+                       albums.artist_id, artists.name,\
+                       (SELECT COUNT(*) FROM tracks\
+                        WHERE tracks.album_id = albums.rowid), NULL,\
+                       matches.rank, 0\
+                FROM matches JOIN albums ON albums.rowid = -matches.id\
+                LEFT JOIN artists ON artists.rowid = albums.artist_id\
+                UNION ALL\
+                SELECT matches.id, albums.rowid, tracks.name,\
+                       albums.artist_id, artists.name, -1,\
+                       (SELECT GROUP_CONCAT(artists.name, ';')\
+                        FROM track_artists, artists\
+                        WHERE track_artists.track_id = tracks.rowid\
+                        AND artists.rowid = track_artists.artist_id\
+                        AND artists.rowid != albums.artist_id),\
+                       matches.rank, 1\
+                FROM matches JOIN tracks ON tracks.rowid = matches.id\
+                JOIN albums ON albums.rowid = tracks.album_id\
+                LEFT JOIN artists ON artists.rowid = albums.artist_id\
+                ORDER BY 8, 9"
+    _FTS_MATCHES = "SELECT rowid FROM search\
+                    WHERE search MATCH ? ORDER BY rank LIMIT ?"
+    _LIKE_MATCHES = "SELECT -albums.rowid\
+                     FROM albums LEFT JOIN artists\
+                     ON artists.rowid = albums.artist_id\
+                     WHERE albums.name LIKE ?1 OR artists.name LIKE ?1\
+                     UNION ALL\
+                     SELECT tracks.rowid FROM tracks\
+                     WHERE tracks.name LIKE ?1\
+                     OR EXISTS (SELECT 1 FROM track_artists, artists\
+                                WHERE track_artists.track_id = tracks.rowid\
+                                AND artists.rowid = track_artists.artist_id\
+                                AND artists.name LIKE ?1)\
+                     LIMIT ?2"
+
+    def __init__(self):
+        # True if FTS5 index exists, None if unknown
+        self._indexed = None
+
+    """
+        Create search index
+        @param sql as sqlite cursor
+        @raise sqlite3.OperationalError if FTS5 is not available
+        @warning: commit needed
+    """
+    def create(self, sql):
+        sql.execute("CREATE VIRTUAL TABLE search USING fts5(name, artists)")
+        # Names are more relevant than artists
+        sql.execute("INSERT INTO search(search, rank)\
+                     VALUES('rank', 'bm25(2.0, 1.0)')")
+        sql.execute(self._ALBUMS % "")
+        sql.execute(self._TRACKS % "")
+        self._indexed = True
+
+    """
+        Index albums and their tracks again
+        @param album ids as [int]
+        @param sql as sqlite cursor
+        @warning: commit needed
+    """
+    def update_albums(self, album_ids, sql=None):
+        if not sql:
+            sql = Objects.sql
+        if not self._has_index(sql):
+            return
+        album_ids = list(album_ids)
+        for i in range(0, len(album_ids), 500):
+            chunk = album_ids[i:i+500]
+            where = ",".join("?" * len(chunk))
+            sql.execute("DELETE FROM search WHERE rowid IN (%s)" % where,
+                        [-album_id for album_id in chunk])
+            sql.execute("DELETE FROM search WHERE rowid IN\
+                            (SELECT rowid FROM tracks\
+                             WHERE album_id IN (%s))" % where, chunk)
+            sql.execute(self._ALBUMS % ("WHERE albums.rowid IN (%s)" %
+                                        where), chunk)
+            sql.execute(self._TRACKS % ("AND tracks.album_id IN (%s)" %
+                                        where), chunk)
+
+    """
+        Remove removed albums and tracks from index
+        @param sql as sqlite cursor
+        @warning: commit needed
+    """
+    def clean(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        if not self._has_index(sql):
+            return
+        sql.execute("DELETE FROM search WHERE rowid < 0\
+                     AND -rowid NOT IN (SELECT rowid FROM albums)")
+        sql.execute("DELETE FROM search WHERE rowid > 0\
+                     AND rowid NOT IN (SELECT rowid FROM tracks)")
+
+    """
+        Search albums and tracks, words are matched as prefixes
+        @param string as str
+        @param limit as int
+        @param sql as sqlite cursor
+        @return [(id as int, album id as int, name as str,
+                  album artist id as int, album artist name as str,
+                  tracks count as int or -1 for tracks,
+                  other artists names as str separated by ';' or None,
+                  is track as bool)], most relevant first
+    """
+    def search(self, string, limit, sql=None):
+        results = []
+        for chunk in self.search_chunks(string, limit, sql):
+            results += chunk
+        return results
+
+    """
+        Search albums and tracks, results are read by chunks,
+        stop iterating to cancel search
+        @param string as str
+        @param limit as int
+        @param sql as sqlite cursor
+        @return generator of [search() result], most relevant first
+    """
+    def search_chunks(self, string, limit, sql=None):
+        if not sql:
+            sql = Objects.sql
+        if not string.split():
+            return
+        ids = self._get_matches(string, limit, sql)
+        size = self._FIRST_CHUNK
+        i = 0
+        while i < len(ids):
+            yield self._get_results(ids[i:i+size], sql)
+            i += size
+            size = self._CHUNK
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Return ids matching string
+        @param string as str
+        @param limit as int
+        @param sql as sqlite cursor
+        @return [int], index rowids, most relevant first
+    """
+    def _get_matches(self, string, limit, sql):
+        if self._has_index(sql):
+            match = " ".join('"%s"*' % word.replace('"', '""')
+                             for word in string.split())
+            result = sql.execute(self._FTS_MATCHES, (match, limit))
+        else:
+            result = sql.execute(self._LIKE_MATCHES,
+                                 ('%' + string + '%', limit))
+        return [row[0] for row in result]
+
+    """
+        Return results for ids
+        @param ids as [int], index rowids
+        @param sql as sqlite cursor
+        @return [search() result], in ids order
+    """
+    def _get_results(self, ids, sql):
+        values = []
+        for position, rowid in enumerate(ids):
+            values += [rowid, position]
+        result = sql.execute(self._RESULTS %
+                             ("VALUES " + ",".join(["(?, ?)"] * len(ids))),
+                             values)
+        return [row[0:7] + (row[8] == 1,) for row in result]
+
+    """
+        True if FTS5 index exists
+        @param sql as sqlite cursor
+        @return bool
+    """
+    def _has_index(self, sql):
+        if self._indexed is None:
+            result = sql.execute("SELECT name FROM sqlite_master\
+                                  WHERE type='table' AND name='search'")
+            self._indexed = result.fetchone() is not None
+        return self._indexed
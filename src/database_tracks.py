@@ -12,6 +12,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from gettext import gettext as _
+import os
 
 from lollypop.define import Objects, Navigation
 
@@ -57,6 +58,46 @@ class DatabaseTracks:
         except Exception as e:
             print("DatabaseTracks::add: ", e, ascii(filepath))
 
+    """
+        Add new tracks to database
+        @param [(name as string, filepath as string, length as int,
+                 tracknumber as int, discnumber as int, album_id as int,
+                 year as int, mtime as int, outside as bool,
+                 size as int, inode as int)]
+        @warning: commit needed
+    """
+    def add_many(self, tracks, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.executemany("INSERT INTO tracks (name, filepath, length,\
+                         tracknumber, discnumber, album_id, year, mtime,\
+                         outside, size, inode)\
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", tracks)
+
+    """
+        Add artists to tracks
+        @param [(track id as int, artist id as int, outside as bool)]
+        @warning: commit needed
+    """
+    def add_artists(self, track_artists, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.executemany("INSERT INTO "
+                        "track_artists (track_id, artist_id, outside)"
+                        "VALUES (?, ?, ?)", track_artists)
+
+    """
+        Add genres to tracks
+        @param [(track id as int, genre id as int, outside as bool)]
+        @warning: commit needed
+    """
+    def add_genres(self, track_genres, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.executemany("INSERT INTO "
+                        "track_genres (track_id, genre_id, outside)"
+                        "VALUES (?, ?, ?)", track_genres)
+
     """
         Add artist to track
         @param track id as int
@@ -104,6 +145,25 @@ class DatabaseTracks:
 
         return -1
 
+    """
+        Return track ids for paths
+        @param filepaths as [str]
+        @return {filepath as str: track id as int}
+    """
+    def get_ids_by_path(self, filepaths, sql=None):
+        if not sql:
+            sql = Objects.sql
+        tracks = {}
+        # Stay under SQLITE_MAX_VARIABLE_NUMBER
+        for i in range(0, len(filepaths), 500):
+            chunk = filepaths[i:i+500]
+            result = sql.execute("SELECT filepath, rowid FROM tracks\
+                                  WHERE filepath IN (%s)" %
+                                 ",".join("?" * len(chunk)), chunk)
+            for (filepath, track_id) in result:
+                tracks[filepath] = track_id
+        return tracks
+
     """
         Get track name for track id
         @param Track id as int
@@ -233,6 +293,75 @@ class DatabaseTracks:
         sql.row_factory = None
         return mtimes
 
+    """
+        Get file stats for tracks
+        @return {filepath as string: (mtime as int, size as int,
+                                      inode as int)}
+    """
+    def get_stats(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        stats = {}
+        result = sql.execute("SELECT filepath, mtime, size, inode FROM tracks")
+        for row in result:
+            stats[row[0]] = row[1:]
+        return stats
+
+    """
+        Get file stats for track at path or tracks under path
+        @param path as string, file or directory
+        @return {filepath as string: (mtime as int, size as int,
+                                      inode as int)}
+    """
+    def get_stats_in(self, path, sql=None):
+        if not sql:
+            sql = Objects.sql
+        stats = {}
+        prefix = os.path.join(path, '')
+        result = sql.execute("SELECT filepath, mtime, size, inode FROM tracks\
+                              WHERE filepath=? OR\
+                              substr(filepath, 1, ?)=?",
+                             (path, len(prefix), prefix))
+        for row in result:
+            stats[row[0]] = row[1:]
+        return stats
+
+    """
+        Set file stats for tracks
+        @param [(size as int, inode as int, filepath as string)]
+        @warning: commit needed
+    """
+    def set_stats(self, stats, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.executemany("UPDATE tracks SET size=?, inode=?\
+                         WHERE filepath=?", stats)
+
+    """
+        Get directories modification times
+        @return {path as string: mtime as int}
+    """
+    def get_dir_mtimes(self, sql=None):
+        if not sql:
+            sql = Objects.sql
+        mtimes = {}
+        result = sql.execute("SELECT path, mtime FROM directories")
+        for row in result:
+            mtimes[row[0]] = row[1]
+        return mtimes
+
+    """
+        Replace directories modification times
+        @param mtimes as {path as string: mtime as int}
+        @warning: commit needed
+    """
+    def set_dir_mtimes(self, mtimes, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.execute("DELETE FROM directories")
+        sql.executemany("INSERT INTO directories (path, mtime)\
+                         VALUES (?, ?)", mtimes.items())
+
     """
         Get all track informations for track id
         @param Track id as int
@@ -250,6 +379,49 @@ class DatabaseTracks:
             return v
         return ()
 
+    """
+        Get track informations needed for playback in one request
+        @param Track id as int
+        @return (name as str, album id as int, album name as str,
+                 aartist id as int, aartist name as str,
+                 artist names as [str], genre name as str "genre1 genre2 ",
+                 length as int, tracknumber as int, filepath as str)
+                 or None if track doesn't exist
+    """
+    def get_playback_infos(self, track_id, sql=None):
+        if not sql:
+            sql = Objects.sql
+        result = sql.execute("SELECT tracks.name, tracks.album_id,\
+                              albums.name, albums.artist_id, artists.name,\
+                              (SELECT GROUP_CONCAT(a.name, '\n')\
+                               FROM track_artists, artists AS a\
+                               WHERE track_artists.track_id = tracks.rowid\
+                               AND a.rowid = track_artists.artist_id),\
+                              (SELECT GROUP_CONCAT(genres.name || ' ', '')\
+                               FROM album_genres, genres\
+                               WHERE album_genres.album_id = albums.rowid\
+                               AND genres.rowid = album_genres.genre_id),\
+                              tracks.length, tracks.tracknumber,\
+                              tracks.filepath\
+                              FROM tracks JOIN albums\
+                              ON albums.rowid = tracks.album_id\
+                              LEFT JOIN artists\
+                              ON artists.rowid = albums.artist_id\
+                              WHERE tracks.rowid=?", (track_id,))
+        v = result.fetchone()
+        if not v:
+            return None
+        aartist = v[4]
+        if v[3] == Navigation.COMPILATIONS:
+            aartist = _("Many artists")
+        elif aartist is None:
+            aartist = _("Unknown")
+        if v[5]:
+            artists = v[5].split('\n')
+        else:
+            artists = []
+        return v[0:4] + (aartist, artists, v[6] or "") + v[7:]
+
     """
         Get aartist id for track id
         @param Track id as int
@@ -441,6 +613,42 @@ class DatabaseTracks:
         sql.execute("DELETE FROM tracks\
                      WHERE rowid=?", (track_id,))
 
+    """
+        Remove tracks in one pass, paths are joined in a temporary table
+        @param filepaths as [string]
+        @return album ids as set of int, albums of removed tracks
+        @warning: commit needed
+    """
+    def remove_many(self, filepaths, sql=None):
+        if not sql:
+            sql = Objects.sql
+        sql.execute("CREATE TEMP TABLE IF NOT EXISTS removed_tracks\
+                     (filepath TEXT PRIMARY KEY)")
+        sql.execute("DELETE FROM removed_tracks")
+        sql.executemany("INSERT OR IGNORE INTO removed_tracks (filepath)\
+                         VALUES (?)", [(f,) for f in filepaths])
+        sql.execute("CREATE TEMP TABLE IF NOT EXISTS removed_track_ids\
+                     (track_id INT PRIMARY KEY, album_id INT)")
+        sql.execute("DELETE FROM removed_track_ids")
+        sql.execute("INSERT INTO removed_track_ids (track_id, album_id)\
+                     SELECT tracks.rowid, tracks.album_id\
+                     FROM tracks, removed_tracks\
+                     WHERE tracks.filepath=removed_tracks.filepath")
+        album_ids = set()
+        result = sql.execute("SELECT DISTINCT album_id\
+                              FROM removed_track_ids")
+        for row in result:
+            album_ids.add(row[0])
+        sql.execute("DELETE FROM track_genres WHERE track_id IN\
+                     (SELECT track_id FROM removed_track_ids)")
+        sql.execute("DELETE FROM track_artists WHERE track_id IN\
+                     (SELECT track_id FROM removed_track_ids)")
+        sql.execute("DELETE FROM tracks WHERE rowid IN\
+                     (SELECT track_id FROM removed_track_ids)")
+        sql.execute("DELETE FROM removed_tracks")
+        sql.execute("DELETE FROM removed_track_ids")
+        return album_ids
+
 #######################
 # PRIVATE             #
 #######################
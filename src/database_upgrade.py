@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+import sqlite3
+
+from lollypop.define import Objects
+from lollypop.database_search import DatabaseSearch
+
+
+# Manage database schema upgrades
+# Key is the schema version reached after upgrade,
+# value is a list of sql requests or a method taking a sqlite cursor
+class DatabaseUpgrade:
+    """
+        Init upgrades
+        @param db version as int
+    """
+    def __init__(self, version):
+        self._version = version
+        self._UPGRADES = {
+            # Collection indexes, drop filepath doublons first
+            8: ["DELETE FROM tracks WHERE rowid NOT IN\
+                    (SELECT MIN(rowid) FROM tracks GROUP BY filepath)",
+                "CREATE UNIQUE INDEX idx_tracks_filepath\
+                    ON tracks(filepath)",
+                "CREATE INDEX idx_tracks_album\
+                    ON tracks(album_id, discnumber, tracknumber)",
+                "CREATE INDEX idx_track_artists_track\
+                    ON track_artists(track_id)",
+                "CREATE INDEX idx_track_artists_artist\
+                    ON track_artists(artist_id)",
+                "CREATE INDEX idx_track_genres_genre\
+                    ON track_genres(genre_id, track_id)",
+                "CREATE INDEX idx_album_genres_genre\
+                    ON album_genres(genre_id, album_id)",
+                "CREATE INDEX idx_albums_artist ON albums(artist_id, name)",
+                "CREATE INDEX idx_artists_name ON artists(name)",
+                "CREATE INDEX idx_genres_name ON genres(name)"],
+            # File stats, used to detect modified files without reading them
+            9: ["ALTER TABLE tracks ADD COLUMN size INT",
+                "ALTER TABLE tracks ADD COLUMN inode INT"],
+            # Directories mtimes, unchanged directories are not listed again
+            10: ["CREATE TABLE directories (path TEXT PRIMARY KEY,\
+                                            mtime INT NOT NULL)"],
+            # Full text search index
+            11: self._create_search_index
+        }
+
+    """
+        Run missing upgrades, one transaction per version
+        Stop at first failure, next start will try again
+        @param sql as sqlite cursor
+        @return True if schema is up to date
+    """
+    def do_db_upgrade(self, sql):
+        for version in sorted(self._UPGRADES.keys()):
+            if version <= self._version:
+                continue
+            upgrade = self._UPGRADES[version]
+            try:
+                sql.execute("BEGIN")
+                if isinstance(upgrade, list):
+                    for request in upgrade:
+                        sql.execute(request)
+                else:
+                    upgrade(sql)
+                sql.commit()
+            except Exception as e:
+                sql.rollback()
+                print("DatabaseUpgrade::do_db_upgrade(%s): %s" % (version, e))
+                return False
+            self._version = version
+            Objects.settings.set_value('db-version',
+                                       GLib.Variant('i', version))
+        return True
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Create full text search index,
+        search uses LIKE requests if sqlite lacks FTS5
+        @param sql as sqlite cursor
+    """
+    def _create_search_index(self, sql):
+        try:
+            DatabaseSearch().create(sql)
+        except sqlite3.OperationalError as e:
+            print("DatabaseUpgrade::_create_search_index(): %s" % e)
@@ -23,9 +23,11 @@ class Objects_:
     artists = None
     genres = None
     tracks = None
+    search = None
     playlists = None
     player = None
     art = None
+    thumbnailer = None
     window = None
     debug = False
 
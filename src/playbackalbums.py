@@ -0,0 +1,90 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from lollypop.define import Objects
+
+
+# Albums in current playlist, in playback order
+# Album tracks are read once, until collection changes
+class PlaybackAlbums:
+    """
+        Init albums
+    """
+    def __init__(self):
+        self._albums = []
+        # Album position as {album id: int}
+        self._positions = {}
+        # Album tracks as {(album id, genre id): [track ids]}
+        self._tracks = {}
+
+    """
+        Number of albums
+        @return int
+    """
+    def __len__(self):
+        return len(self._albums)
+
+    """
+        Set albums, first position wins for doublons
+        @param album ids as [int]
+    """
+    def set_albums(self, album_ids):
+        self._albums = list(album_ids)
+        positions = {}
+        for (i, album_id) in enumerate(self._albums):
+            positions.setdefault(album_id, i)
+        self._positions = positions
+
+    """
+        Return albums
+        @return album ids as [int]
+    """
+    def get_albums(self):
+        return self._albums
+
+    """
+        Return album at position
+        @param position as int
+        @return album id as int
+    """
+    def get_album_id(self, position):
+        return self._albums[position]
+
+    """
+        Return album position
+        @param album id as int
+        @return position as int or None if album is not in albums
+    """
+    def get_position(self, album_id):
+        return self._positions.get(album_id)
+
+    """
+        Return album tracks, read them if not already done
+        @param album id as int
+        @param genre id as int
+        @param sql as sqlite cursor
+        @return track ids as [int]
+        @thread safe
+    """
+    def get_tracks(self, album_id, genre_id, sql=None):
+        tracks = self._tracks.get((album_id, genre_id))
+        if tracks is None:
+            tracks = Objects.albums.get_tracks(album_id, genre_id, sql)
+            self._tracks[(album_id, genre_id)] = tracks
+        return tracks
+
+    """
+        Forget album tracks, collection changed
+    """
+    def reset_tracks(self):
+        self._tracks = {}
@@ -11,6 +11,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+from gi.repository import GLib
+
+from os import path
+from _thread import start_new_thread
+from threading import Lock
+
 from lollypop.tagreader import TagReader
 from lollypop.player_bin import BinPlayer
 from lollypop.player_queue import QueuePlayer
@@ -34,6 +40,13 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer,
         ShufflePlayer.__init__(self)
         UserPlaylistPlayer.__init__(self)
         TagReader.__init__(self)
+        # Planned next track as (generation, current track id,
+        #                        track id, album id, position, in queue)
+        self._next = None
+        self._plan_generation = 0
+        self._plan_scheduled = False
+        self._plan_lock = Lock()
+        self.connect('queue-changed', self._on_queue_changed)
 
     """
         Play previous track
@@ -58,27 +71,26 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer,
         @param sql as sqlite cursor
     """
     def next(self, force=True, sql=None):
-        # Look first at user queue
-        track_id = QueuePlayer.next(self)
-
-        # Look at user playlist then
-        if track_id is None:
-            track_id = UserPlaylistPlayer.next(self)
-
-        # Get a random album/track
-        if track_id is None:
-            track_id = ShufflePlayer.next(self, sql)
-
-        # Get a linear track
-        if track_id is None:
-            track_id = LinearPlayer.next(self, sql)
+        track_id = None
+        planned = self._next
+        if planned is not None and planned[0] == self._plan_generation and\
+           planned[1] == self.current.id:
+            self._next = None
+            (generation, current_id, track_id,
+             album_id, position, in_queue) = planned
+            self.context.album_id = album_id
+            self.context.position = position
+            if in_queue:
+                self.del_from_queue(track_id)
+        else:
+            track_id = self._get_next(sql)
 
         if track_id is not None:
             if force:
                 self.load(track_id)
             else:
                 self._load_track(track_id, sql)
-       
+
     """
         Play album
         @param album id as int
@@ -104,11 +116,13 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer,
         @param album_id as int
     """
     def set_album(self, album_id):
-        self._albums = [album_id]
+        self._albums.set_albums([album_id])
+        self._shuffle_engine.set_albums([album_id])
         self.context.album_id = album_id
         self.context.genre_id = None
-        tracks = Objects.albums.get_tracks(album_id, None)
+        tracks = self._albums.get_tracks(album_id, None)
         self.context.position = tracks.index(self.current.id)
+        self._plan_next()
 
     """
         Set album list (for next/prev)
@@ -121,10 +135,8 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer,
         if track_id is None:
             return
         album_id = Objects.tracks.get_album_id(track_id)
-        self._albums = []
         self._played_tracks_history = []
-        self._already_played_tracks = {}
-        self._already_played_albums = []
+        self._shuffle_engine.reset()
         self.context.genre_id = genre_id
 
         # When shuffle from artist is active, we want only artist's albums,
@@ -139,35 +151,48 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer,
         self._user_playlist = None
         # We are in all artists
         if genre_id_lookup == Navigation.ALL or artist_id == Navigation.ALL:
-            self._albums = Objects.albums.get_compilations(Navigation.ALL)
-            self._albums += Objects.albums.get_ids()
+            albums = Objects.albums.get_compilations(Navigation.ALL)
+            albums += Objects.albums.get_ids()
         # We are in popular view, add popular albums
         elif genre_id_lookup == Navigation.POPULARS:
-            self._albums = Objects.albums.get_populars()
+            albums = Objects.albums.get_populars()
         # We are in recent view, add recent albums
         elif genre_id_lookup == Navigation.RECENTS:
-            self._albums = Objects.albums.get_recents()
+            albums = Objects.albums.get_recents()
         # Random tracks/albums for genre
         elif self._shuffle in [Shuffle.TRACKS, Shuffle.ALBUMS]:
-            self._albums = Objects.albums.get_ids(None, genre_id_lookup)
+            albums = Objects.albums.get_ids(None, genre_id_lookup)
         # Random tracks/albums for artist
         elif self._shuffle in [Shuffle.TRACKS_ARTIST, Shuffle.ALBUMS_ARTIST]:
-            self._albums = Objects.albums.get_ids(artist_id, genre_id_lookup)
+            albums = Objects.albums.get_ids(artist_id, genre_id_lookup)
         # Add all albums for genre
         else:
-            self._albums = Objects.albums.get_compilations(genre_id_lookup)
-            self._albums += Objects.albums.get_ids(None, genre_id_lookup)
+            albums = Objects.albums.get_compilations(genre_id_lookup)
+            albums += Objects.albums.get_ids(None, genre_id_lookup)
+        self._albums.set_albums(albums)
+        self._shuffle_engine.set_albums(albums)
 
         self.context.album_id = album_id
-        tracks = Objects.albums.get_tracks(album_id, genre_id_lookup)
+        tracks = self._albums.get_tracks(album_id, genre_id_lookup)
         if track_id in tracks:
             self.context.position = tracks.index(track_id)
             self.context.genre_id = genre_id
             # Shuffle album list if needed
             self._shuffle_albums()
+            self._plan_next()
         else:
             self.stop()
 
+    """
+        Forget cached tracks, collection changed
+        @param scanner as CollectionScanner
+    """
+    def on_scan_finished(self, scanner):
+        self._albums.reset_tracks()
+        self._shuffle_engine.reset_tracks()
+        self._infos = {}
+        self._plan_next()
+
     """
         Restore player state
     """
@@ -192,3 +217,110 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer,
     def _on_stream_start(self, bus, message):
         BinPlayer._on_stream_start(self, bus, message)
         ShufflePlayer._on_stream_start(self, bus, message)
+        self._plan_next()
+
+    """
+        Add popularity to album, party mode may favor it
+        @param album id as int
+        @thread safe
+    """
+    def _set_more_popular(self, album_id):
+        BinPlayer._set_more_popular(self, album_id)
+        self._shuffle_engine.add_weight(album_id, 1)
+
+    """
+        Get next track and update context
+        @param sql as sqlite cursor
+        @return track id as int or None
+    """
+    def _get_next(self, sql=None):
+        # Look first at user queue
+        track_id = QueuePlayer.next(self)
+
+        # Look at user playlist then
+        if track_id is None:
+            track_id = UserPlaylistPlayer.next(self)
+
+        # Get a random album/track
+        if track_id is None:
+            track_id = ShufflePlayer.next(self, sql)
+
+        # Get a linear track
+        if track_id is None:
+            track_id = LinearPlayer.next(self, sql)
+        return track_id
+
+    """
+        Forget planned next track and plan it again,
+        call it when something changing next track changes
+        @thread safe
+    """
+    def _plan_next(self):
+        self._next = None
+        self._plan_generation += 1
+        if not self._plan_scheduled:
+            self._plan_scheduled = True
+            GLib.idle_add(self._start_planning)
+
+    """
+        Start planning next track for current one
+    """
+    def _start_planning(self):
+        self._plan_scheduled = False
+        if self.current.id is not None:
+            start_new_thread(self._plan_next_thread,
+                             (self._plan_generation, self.current.id))
+
+    """
+        Plan next track, same order as _get_next() but context is not
+        changed. Track must exist and its infos are loaded, so about to
+        finish only has to switch uri
+        @param generation as int, plan is dropped if it changed
+        @param current track id as int
+        @thread safe
+    """
+    def _plan_next_thread(self, generation, current_id):
+        with self._plan_lock:
+            if generation != self._plan_generation:
+                return
+            sql = Objects.db.get_cursor()
+            try:
+                planned = self._get_next_plan(sql)
+                if planned is not None:
+                    infos = self._get_infos(planned[0], sql)
+                    if infos is not None and path.exists(infos[9]) and\
+                       generation == self._plan_generation:
+                        self._next = (generation, current_id) + planned
+            except Exception as e:
+                print("Player::_plan_next_thread(): %s" % e)
+            sql.close()
+
+    """
+        Return next track without changing context
+        @param sql as sqlite cursor
+        @return (track id as int, album id as int,
+                 position as int, in queue as bool) or None
+    """
+    def _get_next_plan(self, sql):
+        album_id = self.context.album_id
+        position = self.context.position
+        if self._queue:
+            return (self._queue[0], album_id, position, True)
+        if self._user_playlist:
+            position = self._get_user_playlist_next()
+            return (self._user_playlist[position], album_id, position, False)
+        if (self._shuffle in [Shuffle.TRACKS, Shuffle.TRACKS_ARTIST] or
+           self._is_party) and self._albums:
+            return (self._shuffle_next(sql), album_id, position, False)
+        linear_next = self._get_linear_next(sql)
+        if linear_next is not None:
+            (album_id, position, track_id) = linear_next
+            return (track_id, album_id, position, False)
+        return None
+
+    """
+        Plan next track again
+        @param player as Player
+    """
+    def _on_queue_changed(self, player):
+        self._plan_next()
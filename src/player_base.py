@@ -14,6 +14,7 @@
 from gi.repository import GObject
 
 from lollypop.define import PlayContext, CurrentTrack, Objects
+from lollypop.playbackalbums import PlaybackAlbums
 
 
 class BasePlayer(GObject.GObject):
@@ -43,18 +44,21 @@ class BasePlayer(GObject.GObject):
             self.current = CurrentTrack()
             self.context = PlayContext()
             # Albums in current playlist
-            self._albums = None
+            self._albums = PlaybackAlbums()
             # Current shuffle mode
             self._shuffle = Objects.settings.get_enum('shuffle')
             # Tracks already played
             self._played_tracks_history = []
             # Used by shuffle albums to restore playlist before shuffle
             self._albums_backup = None
-            # Albums already played
-            self._already_played_albums = []
-            # Tracks already played for albums
-            self._already_played_tracks = {}
             # Party mode
             self._is_party = False
             # Player errors
             self._errors = 0
+
+    """
+        Forget planned next track and plan it again,
+        call it when something changing next track changes
+    """
+    def _plan_next(self):
+        pass
@@ -14,6 +14,8 @@
 from gi.repository import Gst, GLib, GstAudio
 
 from os import path
+from _thread import start_new_thread
+import sqlite3
 
 from lollypop.player_base import BasePlayer
 from lollypop.player_rg import ReplayGainPlayer
@@ -34,6 +36,8 @@ class BinPlayer(ReplayGainPlayer, BasePlayer):
         flags &= ~GstPlayFlags.GST_PLAY_FLAG_VIDEO
         self._playbin.set_property("flags", flags)
         ReplayGainPlayer.__init__(self, self._playbin)
+        # Playback infos for current and next tracks as {track id: infos}
+        self._infos = {}
         self._playbin.connect("about-to-finish",
         self._on_stream_about_to_finish)
         bus = self._playbin.get_bus()
@@ -176,51 +180,35 @@ class BinPlayer(ReplayGainPlayer, BasePlayer):
         if self.context.next == NextContext.STOP_TRACK:
             stop = True
 
+        infos = self._get_infos(track_id, sql)
+        if infos is None:
+            print("BinPlayer::_load_track(): track missing ", track_id)
+            self._on_errors()
+            return False
+
         # Stop if album changed
-        new_album_id = Objects.tracks.get_album_id(
-                                                track_id,
-                                                sql)
         if self.context.next == NextContext.STOP_ALBUM and\
-           self.current.album_id != new_album_id:
+           self.current.album_id != infos[1]:
             stop = True
 
         # Stop if aartist changed
-        new_aartist_id = Objects.tracks.get_aartist_id(
-                                                track_id,
-                                                sql)
         if self.context.next == NextContext.STOP_ARTIST and\
-           self.current.aartist_id != new_aartist_id:
+           self.current.aartist_id != infos[3]:
             stop = True
 
         if stop:
             return False
 
+        (self.current.title, album_id, self.current.album,
+         aartist_id, aartist, artists, self.current.genre,
+         self.current.duration, self.current.number,
+         self.current.path) = infos
         self.current.id = track_id
-        self.current.title = Objects.tracks.get_name(
-                                                self.current.id,
-                                                sql)
-        self.current.album_id = new_album_id
-        self.current.album = Objects.albums.get_name(
-                                                self.current.album_id,
-                                                sql)
-        self.current.aartist_id = new_aartist_id
-        self.current.aartist = translate_artist_name(
-                                        Objects.artists.get_name(
-                                                self.current.aartist_id,
-                                                sql))
-        artist_name = ""
-        for artist_id in Objects.tracks.get_artist_ids(self.current.id,
-                                                       sql):
-            artist_name += translate_artist_name(
-                            Objects.artists.get_name(artist_id, sql)) + ", "
-        self.current.artist = artist_name[:-2]
-
-        self.current.genre = Objects.albums.get_genre_name(
-                                                self.current.album_id,
-                                                sql)
-        self.current.duration = Objects.tracks.get_length(self.current.id, sql)
-        self.current.number = Objects.tracks.get_number(self.current.id, sql)
-        self.current.path = Objects.tracks.get_path(self.current.id, sql)
+        self.current.album_id = album_id
+        self.current.aartist_id = aartist_id
+        self.current.aartist = translate_artist_name(aartist)
+        self.current.artist = ", ".join([translate_artist_name(artist)
+                                         for artist in artists])
         if path.exists(self.current.path):
             try:
                 self._playbin.set_property('uri',
@@ -261,17 +249,28 @@ class BinPlayer(ReplayGainPlayer, BasePlayer):
         When stream is about to finish, switch to next track without gap
     """
     def _on_stream_about_to_finish(self, obj):
-        self._previous_track_id = self.current.id
+        # Add popularity if we listen to the song
+        if self.current.album_id is not None:
+            start_new_thread(self._set_more_popular,
+                             (self.current.album_id,))
         # We are in a thread, we need to create a new cursor
         sql = Objects.db.get_cursor()
         self.next(False, sql)
-        # Add populariy if we listen to the song
-        album_id = Objects.tracks.get_album_id(self._previous_track_id, sql)
+        sql.close()
+
+    """
+        Add popularity to album
+        @param album id as int
+        @thread safe
+    """
+    def _set_more_popular(self, album_id):
+        sql = Objects.db.get_cursor()
         try:
             Objects.albums.set_more_popular(album_id, sql)
-        except:
-            pass
-        sql.close()
+        except sqlite3.OperationalError as e:
+            print("BinPlayer::_set_more_popular(): %s" % e)
+        finally:
+            sql.close()
 
     """
         On error, try 3 more times playing a track
@@ -292,3 +291,24 @@ class BinPlayer(ReplayGainPlayer, BasePlayer):
     def _on_stream_start(self, bus, message):
         self.emit("current-changed")
         self._errors = 0
+
+    """
+        Return playback infos for track, read them if not cached
+        Only current track and track being read are kept in cache
+        @param track id as int
+        @param sql as sqlite cursor
+        @return Objects.tracks.get_playback_infos() result
+        @thread safe
+    """
+    def _get_infos(self, track_id, sql=None):
+        cache = self._infos
+        infos = cache.get(track_id)
+        if infos is None:
+            infos = Objects.tracks.get_playback_infos(track_id, sql)
+            if infos is not None:
+                new_cache = {track_id: infos}
+                current_id = self.current.id
+                if current_id in cache:
+                    new_cache[current_id] = cache[current_id]
+                self._infos = new_cache
+        return infos
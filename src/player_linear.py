@@ -11,7 +11,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from lollypop.define import Objects
 from lollypop.player_base import BasePlayer
 
 
@@ -30,25 +29,11 @@ class LinearPlayer(BasePlayer):
     """
     def next(self, sql=None):
         track_id = None
-        if self.context.position is not None and self._albums:
-            tracks = Objects.albums.get_tracks(self.context.album_id,
-                                               self.context.genre_id,
-                                               sql)
-            if self.context.position + 1 >= len(tracks):  # next album
-                pos = self._albums.index(self.context.album_id)
-                # we are on last album, go to first
-                if pos + 1 >= len(self._albums):
-                    pos = 0
-                else:
-                    pos += 1
-                self.context.album_id = self._albums[pos]
-                self.context.position = 0
-                track_id = Objects.albums.get_tracks(self._albums[pos],
-                                                     self.context.genre_id,
-                                                     sql)[0]
-            else:
-                self.context.position += 1
-                track_id = tracks[self.context.position]
+        linear_next = self._get_linear_next(sql)
+        if linear_next is not None:
+            (self.context.album_id,
+             self.context.position,
+             track_id) = linear_next
         return track_id
 
     """
@@ -59,17 +44,18 @@ class LinearPlayer(BasePlayer):
     def prev(self, sql=None):
         track_id = None
         if track_id is None and self.context.position is not None:
-            tracks = Objects.albums.get_tracks(self.current.album_id,
-                                               self.current.genre_id)
+            tracks = self._albums.get_tracks(self.current.album_id,
+                                             self.current.genre_id)
             if self.context.position <= 0:  # Prev album
-                pos = self._albums.index(self.current.album_id)
-                if pos - 1 < 0:  # we are on last album, go to first
+                pos = self._albums.get_position(self.current.album_id)
+                # we are on first album, go to last
+                if pos is None or pos - 1 < 0:
                     pos = len(self._albums) - 1
                 else:
                     pos -= 1
-                self.current.album_id = self._albums[pos]
-                tracks = Objects.albums.get_tracks(self.current.album_id,
-                                                   self.current.genre_id)
+                self.current.album_id = self._albums.get_album_id(pos)
+                tracks = self._albums.get_tracks(self.current.album_id,
+                                                 self.current.genre_id)
                 self.context.album_id = self.current.album_id
                 self.context.position = len(tracks) - 1
                 track_id = tracks[self.context.position]
@@ -77,3 +63,34 @@ class LinearPlayer(BasePlayer):
                 self.context.position -= 1
                 track_id = tracks[self.context.position]
         return track_id
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Next track based on current context, context is not changed
+        @param sql as sqlite cursor
+        @return (album id as int, position as int, track id as int) or None
+    """
+    def _get_linear_next(self, sql=None):
+        if self.context.position is None or not self._albums:
+            return None
+        tracks = self._albums.get_tracks(self.context.album_id,
+                                         self.context.genre_id,
+                                         sql)
+        if self.context.position + 1 >= len(tracks):  # next album
+            pos = self._albums.get_position(self.context.album_id)
+            # we are on last album, go to first
+            if pos is None or pos + 1 >= len(self._albums):
+                pos = 0
+            else:
+                pos += 1
+            album_id = self._albums.get_album_id(pos)
+            track_id = self._albums.get_tracks(album_id,
+                                               self.context.genre_id,
+                                               sql)[0]
+            return (album_id, 0, track_id)
+        else:
+            return (self.context.album_id,
+                    self.context.position + 1,
+                    tracks[self.context.position + 1])
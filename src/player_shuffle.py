@@ -11,19 +11,27 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+from time import time
 import random
 
 from lollypop.define import Shuffle, NextContext, Objects
 from lollypop.player_base import BasePlayer
+from lollypop.shuffleengine import ShuffleEngine
 
 # Manage shuffle tracks and party mode
 class ShufflePlayer(BasePlayer):
+    # Recent albums weight bonus is halved every 30 days
+    _RECENT_HALF_LIFE = 30 * 24 * 3600
+
     """
         Init shuffle player
     """
     def __init__(self):
        BasePlayer.__init__(self)
+       self._shuffle_engine = ShuffleEngine()
        Objects.settings.connect('changed::shuffle', self._set_shuffle)
+       Objects.settings.connect('changed::party-weighted',
+                                self._set_party_albums)
 
     """
         Next shuffle track
@@ -73,8 +81,7 @@ class ShufflePlayer(BasePlayer):
     """
     def set_party(self, party):
         self._played_tracks_history = []
-        self._already_played_tracks = {}
-        self._already_played_albums = []
+        self._shuffle_engine.reset()
         self._user_playlist = None
         if party:
             self.context.next = NextContext.STOP_NONE
@@ -86,18 +93,22 @@ class ShufflePlayer(BasePlayer):
         if party:
             party_ids = self.get_party_ids()
             if party_ids:
-                self._albums = Objects.albums.get_party_ids(party_ids)
+                self._albums.set_albums(
+                                   Objects.albums.get_party_ids(party_ids))
             else:
-                self._albums = Objects.albums.get_ids()
+                self._albums.set_albums(Objects.albums.get_ids())
+            self._set_party_albums()
             # Start a new song if not playing
             if not self.is_playing() and self._albums:
-                track_id = self._get_random()
-                self.load(track_id)
+                track_id = self._shuffle_next()
+                if track_id is not None:
+                    self.load(track_id)
         else:
             # We need to put some context, take first available genre
             if self.current.id:
                 self.set_albums(self.current.id,
                                 self.current.aartist_id, None)
+        self._plan_next()
 
     """
         True if party mode on
@@ -128,6 +139,7 @@ class ShufflePlayer(BasePlayer):
             self.set_albums(self.current.id,
                             self.current.aartist_id,
                             self.context.genre_id)
+        self._plan_next()
 
     """
         Shuffle album list
@@ -135,66 +147,55 @@ class ShufflePlayer(BasePlayer):
     def _shuffle_albums(self):
         if self._shuffle in [Shuffle.ALBUMS, Shuffle.ALBUMS_ARTIST]:
             if self._albums:
-                self._albums_backup = list(self._albums)
-                random.shuffle(self._albums)
+                self._albums_backup = list(self._albums.get_albums())
+                albums = list(self._albums_backup)
+                random.shuffle(albums)
+                self._albums.set_albums(albums)
         elif self._shuffle == Shuffle.NONE:
             if self._albums_backup:
-                self._albums = self._albums_backup
+                self._albums.set_albums(self._albums_backup)
                 self._albums_backup = None
 
     """
-        Next track in shuffle mode
-        if force, stop current track
-        a fresh sqlite cursor should be passed as sql if we are in a thread
-        @param sqlite cursor
-        @return track id as int
+        Set party albums in shuffle engine,
+        weighted by popularity and recency if wanted
+        @param settings as Gio.Settings, value as str
     """
-    def _shuffle_next(self, sql=None):
-        track_id = self._get_random(sql)
-        # Need to clear history
-        if not track_id:
-            self._albums = self._already_played_albums
-            self._played_tracks_history = []
-            self._already_played_tracks = {}
-            self._already_played_albums = []
-            return self._shuffle_next(sql)
-
-        return track_id
+    def _set_party_albums(self, settings=None, value=None):
+        if not self._is_party:
+            return
+        if Objects.settings.get_value('party-weighted'):
+            self._shuffle_engine.set_albums(self._albums.get_albums(),
+                                            self._get_party_weights())
+        else:
+            self._shuffle_engine.set_albums(self._albums.get_albums())
 
     """
-        Return a random track and make sure it has never been played
-        @param sqlite cursor as sql if running in a thread
+        Return party albums weights: one, plus popularity,
+        plus a bonus for recent albums, as big as popular albums
+        popularity when album is new
+        @return [int], same order as albums
     """
-    def _get_random(self, sql=None):
-        for album_id in sorted(self._albums,
-                               key=lambda *args: random.random()):
-            tracks = Objects.albums.get_tracks(album_id,
-                                               self.current.genre_id,
-                                               sql)
-            for track in sorted(tracks, key=lambda *args: random.random()):
-                if album_id not in self._already_played_tracks.keys() or\
-                   track not in self._already_played_tracks[album_id]:
-                    return track
-            # No new tracks for this album, remove it
-            # If albums not in shuffle history, it's not present
-            # in db anymore (update since shuffle set)
-            if album_id in self._already_played_tracks.keys():
-                self._already_played_tracks.pop(album_id)
-                self._already_played_albums.append(album_id)
-            self._albums.remove(album_id)
-
-        return None
+    def _get_party_weights(self):
+        popularities = Objects.albums.get_popularities()
+        bonus = Objects.albums.get_avg_popularity()
+        now = time()
+        weights = []
+        for album_id in self._albums.get_albums():
+            (popularity, mtime) = popularities.get(album_id, (0, 0))
+            age = max(now - mtime, 0)
+            weights.append(1 + popularity + int(
+                    bonus * 0.5 ** (age / self._RECENT_HALF_LIFE)))
+        return weights
 
     """
-        Add a track to shuffle history
-        @param track id as int
-        @param album id as int
+        Next track in shuffle mode
+        a fresh sqlite cursor should be passed as sql if we are in a thread
+        @param sqlite cursor
+        @return track id as int or None
     """
-    def _add_to_shuffle_history(self, track_id, album_id):
-        if self.current.album_id not in self._already_played_tracks.keys():
-            self._already_played_tracks[self.current.album_id] = []
-        self._already_played_tracks[self.current.album_id].append(
-                                                              self.current.id)
+    def _shuffle_next(self, sql=None):
+        return self._shuffle_engine.next(sql)
 
     """
         On stream start add to shuffle history
@@ -205,5 +206,4 @@ class ShufflePlayer(BasePlayer):
             if self.current.id in self._played_tracks_history:
                 self._played_tracks_history.remove(self.current.id)
             self._played_tracks_history.append(self.current.id)
-            self._add_to_shuffle_history(self.current.id,
-                                         self.current.album_id)
+            self._shuffle_engine.add_played(self.current.id)
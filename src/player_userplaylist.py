@@ -34,18 +34,21 @@ class UserPlaylistPlayer(BasePlayer):
         self.context.album_id = None
         self.context.position = self._user_playlist.index(track_id)
         self._shuffle_playlist()
+        self._plan_next()
 
     """
         Add track to user playlist
     """
     def add_to_user_playlist(self, track_id):
         self._user_playlist.append(track_id)
+        self._plan_next()
 
     """
         Clear user playlist
     """
     def clear_user_playlist(self):
         self._user_playlist = []
+        self._plan_next()
 
     """
         Next track id
@@ -54,9 +57,7 @@ class UserPlaylistPlayer(BasePlayer):
     def next(self):
         track_id = None
         if self._user_playlist:
-            self.context.position += 1
-            if self.context.position >= len(self._user_playlist):
-                self.context.position = 0
+            self.context.position = self._get_user_playlist_next()
             track_id = self._user_playlist[self.context.position]
         return track_id
 
@@ -76,6 +77,16 @@ class UserPlaylistPlayer(BasePlayer):
 #######################
 # PRIVATE             #
 #######################
+    """
+        Next position in user playlist, context is not changed
+        @return position as int
+    """
+    def _get_user_playlist_next(self):
+        position = self.context.position + 1
+        if position >= len(self._user_playlist):
+            position = 0
+        return position
+
     """
         Shuffle/Un-shuffle playlist based on shuffle setting
     """
@@ -29,6 +29,7 @@ class SearchRow(Gtk.ListBoxRow):
         Gtk.ListBoxRow.__init__(self)
         self._parent = parent
         self.id = None
+        self.album_id = None
         self.is_track = False
         builder = Gtk.Builder()
         builder.add_from_resource('/org/gnome/Lollypop/SearchRow.ui')
@@ -70,23 +71,6 @@ class SearchRow(Gtk.ListBoxRow):
         self._cover.set_from_pixbuf(pixbuf)
         del pixbuf
 
-    """
-        Return True if self exists in items
-        @param: items as array of searchObject
-    """
-    def exists(self, items):
-        found = False
-        for item in items:
-            if item.is_track and self.is_track:
-                if item.id == self.id:
-                    found = True
-                    break
-            elif not item.is_track and not self.is_track:
-                if item.id == self.id:
-                    found = True
-                    break
-        return found
-
 #######################
 # PRIVATE             #
 #######################
@@ -123,6 +107,8 @@ class SearchObject:
         self.id = None
         self.album_id = None
         self.is_track = False
+        # As AlbumArt.get_cached()
+        self.cover = None
 
 ######################################################################
 ######################################################################
@@ -130,6 +116,8 @@ class SearchObject:
 
 # Show a list of search row
 class SearchWidget(Gtk.Popover):
+    # Max results shown
+    _MAX_RESULTS = 100
 
     """
         Init Popover ui with a text entry and a scrolled treeview
@@ -138,9 +126,10 @@ class SearchWidget(Gtk.Popover):
     def __init__(self, parent):
         Gtk.Popover.__init__(self)
         self._parent = parent
-        self._in_thread = False
-        self._stop_thread = False
+        # Incremented on each search, running search stops if changed
+        self._generation = 0
         self._timeout = None
+        Objects.player.connect("cover-changed", self._on_cover_changed)
 
         grid = Gtk.Grid()
         grid.set_property("orientation", Gtk.Orientation.VERTICAL)
@@ -201,37 +190,18 @@ class SearchWidget(Gtk.Popover):
         Objects.window.enable_global_shorcuts(True)
 
     """
-        Remove row not existing in view, thread safe
-    """
-    def _clear(self, results):
-        for child in self._view.get_children():
-            if not results or not child.exists(results):
-                GLib.idle_add(child.destroy)
-
-    """
-        Return True if item exist in rows
-        @param: item as SearchObject
+        Remove all rows
     """
-    def _exists(self, item):
-        found = False
+    def _clear(self):
         for child in self._view.get_children():
-            if item.is_track and child.is_track:
-                if item.id == child.id:
-                    found = True
-                    break
-            elif not item.is_track and not child.is_track:
-                if item.id == child.id:
-                    found = True
-                    break
-        return found
+            child.destroy()
 
     """
         Timeout filtering, call _really_do_filterting() after a small timeout
     """
     def _do_filtering(self, data=None):
-        if self._in_thread:
-            self._stop_thread = True
-            GLib.timeout_add(100, self._do_filtering)
+        # Stop running search
+        self._generation += 1
 
         if self._timeout:
                 GLib.source_remove(self._timeout)
@@ -240,110 +210,109 @@ class SearchWidget(Gtk.Popover):
         if self._text_entry.get_text() != "":
             self._timeout = GLib.timeout_add(100, self._do_filtering_thread)
         else:
-            self._clear([])
+            self._clear()
 
     """
         Just run _really_do_filtering in a thread
     """
     def _do_filtering_thread(self):
         self._timeout = None
-        self._in_thread = True
-        start_new_thread(self._really_do_filtering, ())
+        start_new_thread(self._really_do_filtering,
+                         (self._text_entry.get_text(), self._generation))
 
     """
-        Populate treeview searching items
-        in db based on text entry current text
+        Populate treeview searching items in db,
+        results are sent to main loop by chunks
+        @param searched as str
+        @param generation as int
     """
-    def _really_do_filtering(self):
+    def _really_do_filtering(self, searched, generation):
         sql = Objects.db.get_cursor()
-        results = []
-        albums = []
-
-        searched = self._text_entry.get_text()
-
-        tracks_non_aartist = []
-
-        # Get all albums for all artists and non aartist tracks
-        for artist_id in Objects.artists.search(searched, sql):
-            for album_id in Objects.albums.get_ids(artist_id, None, sql):
-                if (album_id, artist_id) not in albums:
-                    albums.append((album_id, artist_id))
-            for track_id, track_name in Objects.tracks.get_as_non_aartist(
-                                                                   artist_id,
-                                                                   sql):
-                tracks_non_aartist.append((track_id, track_name))
-
-        albums += Objects.albums.search(searched, sql)
-
-        for album_id, artist_id in albums:
-            search_obj = SearchObject()
-            search_obj.artist = Objects.artists.get_name(artist_id, sql)
-            search_obj.title = Objects.albums.get_name(album_id, sql)
-            search_obj.count = Objects.albums.get_count(album_id, None, sql)
-            search_obj.id = album_id
-            search_obj.album_id = album_id
-            results.append(search_obj)
-
-        for track_id, track_name in Objects.tracks.search(searched, sql) +\
-                tracks_non_aartist:
-            search_obj = SearchObject()
-            search_obj.title = track_name
-            search_obj.id = track_id
-            search_obj.album_id = Objects.tracks.get_album_id(track_id, sql)
-            search_obj.is_track = True
-
-            album_artist_id = Objects.albums.get_artist_id(search_obj.album_id,
-                                                           sql)
-            artist_name = ""
-            if album_artist_id != Navigation.COMPILATIONS:
-                artist_name = Objects.albums.get_artist_name(
-                                            search_obj.album_id,
-                                            sql) + ", "
-            for artist_id in Objects.tracks.get_artist_ids(track_id, sql):
-                if artist_id != album_artist_id:
-                    artist_name += translate_artist_name(
-                                    Objects.artists.get_name(artist_id,
-                                                             sql)) + ", "
-
-            search_obj.artist = artist_name[:-2]
-
-            results.append(search_obj)
-
-        if not self._stop_thread:
-            self._clear(results)
-            GLib.idle_add(self._add_rows, results)
-        else:
-            self._in_thread = False
-            self._stop_thread = False
-
+        first = True
+        for chunk in Objects.search.search_chunks(searched,
+                                                  self._MAX_RESULTS,
+                                                  sql):
+            # A newer search started
+            if generation != self._generation:
+                break
+            results = []
+            for (item_id, album_id, name, album_artist_id, album_artist,
+                 count, artists, is_track) in chunk:
+                search_obj = SearchObject()
+                search_obj.title = name
+                search_obj.album_id = album_id
+                search_obj.is_track = is_track
+                if is_track:
+                    search_obj.id = item_id
+                    artist_name = ""
+                    if album_artist_id != Navigation.COMPILATIONS:
+                        artist_name = album_artist + ", "
+                    if artists is not None:
+                        for artist in artists.split(';'):
+                            artist_name += translate_artist_name(artist) +\
+                                           ", "
+                    search_obj.artist = artist_name[:-2]
+                else:
+                    search_obj.id = album_id
+                    search_obj.count = count
+                    if album_artist_id == Navigation.COMPILATIONS:
+                        search_obj.artist = _("Many artists")
+                    else:
+                        search_obj.artist = album_artist
+                search_obj.cover = Objects.art.get_cached(album_id,
+                                                          ArtSize.MEDIUM,
+                                                          sql)
+                results.append(search_obj)
+            GLib.idle_add(self._add_rows, results, generation, first)
+            first = False
+        # Nothing found, remove previous results
+        if first:
+            GLib.idle_add(self._add_rows, [], generation, True)
         sql.close()
 
     """
-        Add a rows recursively
-        @param results as array of SearchObject
-    """
-    def _add_rows(self, results):
-        if results:
-            result = results.pop(0)
-            if not self._exists(result):
-                search_row = SearchRow(self._parent)
-                search_row.set_artist(result.artist)
-                if result.count != -1:
-                    result.title += " (%s)" % result.count
-                search_row.set_title(result.title)
-                search_row.set_cover(Objects.art.get(result.album_id,
-                                                     ArtSize.MEDIUM))
-                search_row.id = result.id
-                search_row.is_track = result.is_track
-                self._view.add(search_row)
-            if self._stop_thread:
-                self._in_thread = False
-                self._stop_thread = False
+        Add rows for a results chunk
+        @param results as [SearchObject]
+        @param generation as int
+        @param first as bool, previous rows are removed on first chunk
+    """
+    def _add_rows(self, results, generation, first):
+        if generation != self._generation:
+            return
+        if first:
+            self._clear()
+        # Albums without cached cover
+        missing = []
+        for result in results:
+            search_row = SearchRow(self._parent)
+            search_row.set_artist(result.artist)
+            if result.count != -1:
+                result.title += " (%s)" % result.count
+            search_row.set_title(result.title)
+            if result.cover is None:
+                default = Objects.art.get_default(ArtSize.MEDIUM)
+                search_row.set_cover(Objects.art.get_frame(default,
+                                                           ArtSize.MEDIUM))
+                missing.append(result.album_id)
             else:
-                GLib.idle_add(self._add_rows, results)
-        else:
-            self._in_thread = False
-            self._stop_thread = False
+                search_row.set_cover(Objects.art.get_frame(result.cover,
+                                                           ArtSize.MEDIUM))
+            search_row.id = result.id
+            search_row.album_id = result.album_id
+            search_row.is_track = result.is_track
+            self._view.add(search_row)
+        if missing:
+            Objects.thumbnailer.add(missing)
+
+    """
+        Update rows cover
+        @param player as Player
+        @param album id as int
+    """
+    def _on_cover_changed(self, player, album_id):
+        for child in self._view.get_children():
+            if child.album_id == album_id:
+                child.set_cover(Objects.art.get(album_id, ArtSize.MEDIUM))
 
     """
         Play searched item when selected
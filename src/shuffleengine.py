@@ -0,0 +1,254 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Lock
+import random
+
+from lollypop.define import Objects
+
+
+# Random tracks for shuffle tracks and party mode
+# A random album with tracks not played is picked,
+# then its next track in a shuffled tracks list
+# Albums with all tracks played are moved at end of albums list,
+# tracks of an album are read and shuffled when album is first picked
+# When all tracks are played, history is cleared
+# With weights, albums are picked in proportion to their weight,
+# using a Fenwick tree of weights, albums with all tracks played weigh 0
+class ShuffleEngine:
+    """
+        Init engine
+    """
+    def __init__(self):
+        self._lock = Lock()
+        # Album ids, without weights albums with tracks not played first
+        self._albums = []
+        # Albums with tracks not played count
+        self._active = 0
+        # Shuffled tracks as {album id: [track ids]}
+        self._tracks = {}
+        # Next track position as {album id: int}
+        self._cursors = {}
+        # Played track ids
+        self._played = set()
+        # Album weights as [int], same order as albums, None if not weighted
+        self._weights = None
+        # Fenwick tree of weights for albums with tracks not played
+        self._tree = None
+        # Album position as {album id: int}, only used with weights
+        self._positions = {}
+        # Positions of albums with all tracks played
+        self._exhausted = set()
+
+    """
+        Set albums to pick tracks from, history is kept
+        @param album ids as [int]
+        @param weights as [int] or None, same order as album ids
+    """
+    def set_albums(self, album_ids, weights=None):
+        with self._lock:
+            if weights is None:
+                self._albums = list(dict.fromkeys(album_ids))
+                self._weights = None
+                self._positions = {}
+            else:
+                album_weights = dict(zip(album_ids, weights))
+                self._albums = list(album_weights.keys())
+                self._weights = [max(weight, 1)
+                                 for weight in album_weights.values()]
+                self._positions = {album_id: i for (i, album_id)
+                                   in enumerate(self._albums)}
+            self._tracks = {}
+            self._cursors = {}
+            self._activate_all()
+
+    """
+        Add weight to album
+        @param album id as int
+        @param weight as int
+    """
+    def add_weight(self, album_id, weight):
+        with self._lock:
+            i = self._positions.get(album_id)
+            if i is None:
+                return
+            self._weights[i] += weight
+            if i not in self._exhausted:
+                self._tree_add(i, weight)
+
+    """
+        Forget album tracks, they will be read again
+    """
+    def reset_tracks(self):
+        with self._lock:
+            self._tracks = {}
+            self._cursors = {}
+
+    """
+        Clear history
+    """
+    def reset(self):
+        with self._lock:
+            self._restart()
+
+    """
+        Add track to history
+        @param track id as int
+        @thread safe
+    """
+    def add_played(self, track_id):
+        self._played.add(track_id)
+
+    """
+        Return a random track not played,
+        history is cleared if all tracks were played
+        @param sql as sqlite cursor
+        @return track id as int or None if there is no track
+        @thread safe
+    """
+    def next(self, sql=None):
+        with self._lock:
+            track_id = self._pick(sql)
+            if track_id is None and self._played:
+                self._restart()
+                track_id = self._pick(sql)
+            return track_id
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Clear history, all albums have tracks not played again
+    """
+    def _restart(self):
+        self._played = set()
+        self._cursors = {}
+        self._activate_all()
+
+    """
+        Mark all albums as having tracks not played
+    """
+    def _activate_all(self):
+        self._active = len(self._albums)
+        self._exhausted = set()
+        if self._weights is None:
+            self._tree = None
+        else:
+            # Fenwick tree built in linear time
+            tree = [0] + self._weights
+            for i in range(1, len(tree)):
+                parent = i + (i & -i)
+                if parent < len(tree):
+                    tree[parent] += tree[i]
+            self._tree = tree
+
+    """
+        Pick a random album and return its next track not played
+        @param sql as sqlite cursor
+        @return track id as int or None if all tracks were played
+    """
+    def _pick(self, sql):
+        if self._tree is not None:
+            return self._pick_weighted(sql)
+        while self._active:
+            i = random.randrange(self._active)
+            album_id = self._albums[i]
+            track_id = self._get_next_track(album_id, sql)
+            if track_id is not None:
+                return track_id
+            # All album tracks played, swap it with last album not played
+            self._active -= 1
+            self._albums[i] = self._albums[self._active]
+            self._albums[self._active] = album_id
+        return None
+
+    """
+        Pick a random album in proportion to its weight
+        and return its next track not played
+        @param sql as sqlite cursor
+        @return track id as int or None if all tracks were played
+    """
+    def _pick_weighted(self, sql):
+        while self._active:
+            i = self._tree_find(random.randrange(self._tree_sum()))
+            track_id = self._get_next_track(self._albums[i], sql)
+            if track_id is not None:
+                return track_id
+            # All album tracks played, remove its weight
+            self._active -= 1
+            self._exhausted.add(i)
+            self._tree_add(i, -self._weights[i])
+        return None
+
+    """
+        Add value to album weight in tree
+        @param album position as int
+        @param value as int
+    """
+    def _tree_add(self, i, value):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += value
+            i += i & -i
+
+    """
+        Return sum of weights in tree
+        @return int
+    """
+    def _tree_sum(self):
+        total = 0
+        i = len(self._tree) - 1
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    """
+        Return album position for a value lower than weights sum:
+        first album with weights sum up to it greater than value
+        @param value as int
+        @return album position as int
+    """
+    def _tree_find(self, value):
+        i = 0
+        step = 1
+        while step * 2 < len(self._tree):
+            step *= 2
+        while step:
+            if i + step < len(self._tree) and self._tree[i + step] <= value:
+                i += step
+                value -= self._tree[i]
+            step //= 2
+        return i
+
+    """
+        Return next album track not played
+        @param album id as int
+        @param sql as sqlite cursor
+        @return track id as int or None
+    """
+    def _get_next_track(self, album_id, sql):
+        tracks = self._tracks.get(album_id)
+        if tracks is None:
+            tracks = list(Objects.albums.get_tracks(album_id, None, sql))
+            self._tracks[album_id] = tracks
+        cursor = self._cursors.get(album_id)
+        if cursor is None:
+            random.shuffle(tracks)
+            cursor = 0
+        while cursor < len(tracks) and tracks[cursor] in self._played:
+            cursor += 1
+        self._cursors[album_id] = cursor
+        if cursor < len(tracks):
+            return tracks[cursor]
+        return None
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import sqlite3
+import os
+
+
+# Tags read from files, kept outside collection db
+# so they survive db resets and outside tracks removal
+# An entry is valid while file size and mtime don't change
+class TagCache:
+    _CACHE_PATH = os.path.expanduser("~") + "/.cache/lollypop"
+    _DB_PATH = "%s/tags.db" % _CACHE_PATH
+    # Bump to drop cache when TagReader.get_tags() changes
+    _VERSION = 1
+    # Max sqlite variables per request
+    _CHUNK_SIZE = 500
+
+    """
+        Create cache if needed
+    """
+    def __init__(self):
+        try:
+            if not os.path.exists(self._CACHE_PATH):
+                os.makedirs(self._CACHE_PATH)
+            sql = self.get_cursor()
+            version = sql.execute("PRAGMA user_version").fetchone()[0]
+            if version != self._VERSION:
+                sql.execute("DROP TABLE IF EXISTS tags")
+                sql.execute("PRAGMA user_version=%s" % self._VERSION)
+            sql.execute("CREATE TABLE IF NOT EXISTS tags (\
+                            path TEXT PRIMARY KEY,\
+                            size INT NOT NULL,\
+                            mtime INT NOT NULL,\
+                            title TEXT NOT NULL,\
+                            artists TEXT NOT NULL,\
+                            aartist TEXT,\
+                            album TEXT NOT NULL,\
+                            genres TEXT NOT NULL,\
+                            discnumber INT,\
+                            tracknumber INT,\
+                            year INT,\
+                            length DOUBLE)")
+            sql.commit()
+            sql.close()
+        except Exception as e:
+            print("TagCache::__init__(): %s" % e)
+
+    """
+        Return a new sqlite cursor
+        @return sqlite cursor or None if cache is unavailable
+    """
+    def get_cursor(self):
+        try:
+            return sqlite3.connect(self._DB_PATH, 600.0)
+        except Exception as e:
+            print("TagCache::get_cursor(): %s" % e)
+            return None
+
+    """
+        Get cached tags for files
+        @param stats as {filepath as str: (mtime as int, size as int, ...)}
+        @param sql as sqlite cursor
+        @return {filepath as str: tags as TagReader.get_tags()},
+                only for files unchanged since cached
+    """
+    def get(self, stats, sql):
+        tags = {}
+        if sql is None:
+            return tags
+        filepaths = list(stats.keys())
+        try:
+            for i in range(0, len(filepaths), self._CHUNK_SIZE):
+                chunk = filepaths[i:i+self._CHUNK_SIZE]
+                result = sql.execute("SELECT * FROM tags WHERE path IN (%s)" %
+                                     ",".join("?" * len(chunk)), chunk)
+                for row in result:
+                    (mtime, size) = stats[row[0]][0:2]
+                    if row[1] == size and row[2] == mtime:
+                        tags[row[0]] = row[3:]
+        except Exception as e:
+            print("TagCache::get(): %s" % e)
+        return tags
+
+    """
+        Cache tags for files
+        @param entries as [(filepath as str, mtime as int, size as int,
+                            tags as TagReader.get_tags())]
+        @param sql as sqlite cursor
+    """
+    def set(self, entries, sql):
+        if sql is None or not entries:
+            return
+        try:
+            sql.executemany("INSERT OR REPLACE INTO tags\
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [(filepath, size, mtime) + tuple(tags)
+                             for (filepath, mtime, size, tags) in entries])
+            sql.commit()
+        except Exception as e:
+            print("TagCache::set(): %s" % e)
+
+    """
+        Remove files from cache
+        @param filepaths as [str]
+        @param sql as sqlite cursor
+    """
+    def remove(self, filepaths, sql):
+        if sql is None:
+            return
+        try:
+            sql.executemany("DELETE FROM tags WHERE path=?",
+                            [(filepath,) for filepath in filepaths])
+            sql.commit()
+        except Exception as e:
+            print("TagCache::remove(): %s" % e)
@@ -13,6 +13,14 @@
 
 from gi.repository import GLib, Gst, GstPbutils
 
+from _thread import start_new_thread
+from queue import Queue
+from gettext import gettext as _
+import os
+
+from lollypop.tagreader_native import NativeTagReader
+
+
 # Tag reader class
 class TagReader:
     """
@@ -20,6 +28,21 @@ class TagReader:
     """
     def __init__(self):
         self._tagreader = GstPbutils.Discoverer.new(10*Gst.SECOND)
+        self._native = NativeTagReader()
+
+    """
+        Return tags for file at path, read file headers when possible,
+        else use a Discoverer pipeline
+        @param path as str
+        @return tags as TagReader.get_tags() or None
+    """
+    def read_tags(self, path):
+        tags = self._native.get_tags(path)
+        if tags is None:
+            infos = self.get_infos(path)
+            if infos is not None:
+                tags = self.get_tags(infos, path)
+        return tags
 
     """
         Return informations on file at path
@@ -33,3 +56,156 @@ class TagReader:
             return infos
         except:
             return None
+
+    """
+        Return tags from informations
+        @param infos as GstPbutils.DiscovererInfo
+        @param path as str
+        @return (title as str, artists as str "artist1;artist2",
+                 album artist as str or None, album as str,
+                 genres as str "genre1;genre2", discnumber as int,
+                 tracknumber as int, year as int or None, length as float)
+    """
+    def get_tags(self, infos, path):
+        tags = infos.get_tags()
+
+        (exist, title) = tags.get_string_index('title', 0)
+        if not exist:
+            title = os.path.basename(path)
+
+        artists = ""
+        size = tags.get_tag_size('artist')
+        if size == 0:
+            artists = _("Unknown")
+        else:
+            for i in range(0, size):
+                (exist, artist) = tags.get_string_index('artist', i)
+                artists += artist
+                if i < size-1:
+                    artists += ";"
+
+        (exist, aartist) = tags.get_string_index('album-artist', 0)
+        if not exist:
+            aartist = None
+
+        (exist, album) = tags.get_string_index('album', 0)
+        if not exist:
+            album = _("Unknown")
+
+        genres = ""
+        size = tags.get_tag_size('genre')
+        if size == 0:
+            genres = _("Unknown")
+        else:
+            for i in range(0, size):
+                (exist, genre) = tags.get_string_index('genre', i)
+                genres += genre
+                if i < size-1:
+                    genres += ";"
+
+        (exist, discnumber) = tags.get_uint_index('album-disc-number', 0)
+        if not exist:
+            discnumber = 0
+
+        (exist, tracknumber) = tags.get_uint_index('track-number', 0)
+        if not exist:
+            tracknumber = 0
+
+        (exist, datetime) = tags.get_date_time('datetime')
+        if exist:
+            year = datetime.get_year()
+        else:
+            year = None
+
+        length = infos.get_duration()/1000000000
+
+        return (title, artists, aartist, album, genres,
+                discnumber, tracknumber, year, length)
+
+
+# Pool of tag readers, each worker owns its own discoverer
+class TagReaderPool:
+    """
+        Init pool
+        @param workers as int, one per cpu if 0
+    """
+    def __init__(self, workers=0):
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        self._workers = workers
+        self._stop = False
+
+    """
+        Read tags for files in workers,
+        results are yielded as soon as available, unordered
+        @param paths as [str]
+        @return generator of (path as str, tags as TagReader.get_tags()
+                              or None if unreadable)
+    """
+    def get_infos(self, paths):
+        self._stop = False
+        if not paths:
+            return
+        workers = min(self._workers, len(paths))
+        pending = Queue()
+        for path in paths:
+            pending.put(path)
+        # Bounded, workers wait for the writer
+        results = Queue(maxsize=workers*16)
+        for i in range(0, workers):
+            pending.put(None)
+            start_new_thread(self._worker, (pending, results))
+        running = workers
+        try:
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+        finally:
+            # Generator closed early, let workers exit
+            self._stop = True
+            while running:
+                if results.get() is None:
+                    running -= 1
+
+    """
+        Stop reading, workers exit after current file
+    """
+    def stop(self):
+        self._stop = True
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Read paths until None, put results in queue
+        @param pending as Queue
+        @param results as Queue
+        @thread safe
+    """
+    def _worker(self, pending, results):
+        try:
+            tagreader = TagReader()
+            path = pending.get()
+            while path is not None:
+                if not self._stop:
+                    results.put((path, self._get_tags(tagreader, path)))
+                path = pending.get()
+        except Exception as e:
+            print("TagReaderPool::_worker(): %s" % e)
+        results.put(None)
+
+    """
+        Return tags for path
+        @param tagreader as TagReader
+        @param path as str
+        @return tags as TagReader.get_tags() or None
+    """
+    def _get_tags(self, tagreader, path):
+        try:
+            return tagreader.read_tags(path)
+        except Exception as e:
+            print("TagReaderPool::_get_tags(): %s" % e, ascii(path))
+        return None
@@ -0,0 +1,612 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gettext import gettext as _
+from struct import unpack_from
+import os
+import re
+
+from lollypop.utils import debug
+
+
+# Read tags from file headers, without a GStreamer pipeline
+# Handle ID3v2 (mp3), FLAC, Ogg Vorbis/Opus and MP4 files
+# When a file looks unusual, None is returned and caller
+# should fallback to Discoverer
+class NativeTagReader:
+    # ID3v2 frames, v2.2 and v2.3/v2.4 ids
+    _ID3_FRAMES = {
+        'TIT2': 'title', 'TT2': 'title',
+        'TPE1': 'artist', 'TP1': 'artist',
+        'TPE2': 'album-artist', 'TP2': 'album-artist',
+        'TALB': 'album', 'TAL': 'album',
+        'TCON': 'genre', 'TCO': 'genre',
+        'TRCK': 'track-number', 'TRK': 'track-number',
+        'TPOS': 'album-disc-number', 'TPA': 'album-disc-number',
+        'TDRC': 'year', 'TYER': 'year', 'TYE': 'year'
+    }
+    # Vorbis comments fields
+    _VORBIS_FIELDS = {
+        'TITLE': 'title',
+        'ARTIST': 'artist',
+        'ALBUMARTIST': 'album-artist',
+        'ALBUM ARTIST': 'album-artist',
+        'ALBUM': 'album',
+        'GENRE': 'genre',
+        'TRACKNUMBER': 'track-number',
+        'DISCNUMBER': 'album-disc-number',
+        'DATE': 'year'
+    }
+    # MP4 ilst items
+    _MP4_ITEMS = {
+        b'\xa9nam': 'title',
+        b'\xa9ART': 'artist',
+        b'aART': 'album-artist',
+        b'\xa9alb': 'album',
+        b'\xa9gen': 'genre',
+        b'\xa9day': 'year',
+        b'trkn': 'track-number',
+        b'disk': 'album-disc-number'
+    }
+    # MPEG audio bitrates in kbps, by (mpeg 1 or 2, layer)
+    _MPEG_BITRATES = {
+        (1, 1): [0, 32, 64, 96, 128, 160, 192, 224,
+                 256, 288, 320, 352, 384, 416, 448],
+        (1, 2): [0, 32, 48, 56, 64, 80, 96, 112,
+                 128, 160, 192, 224, 256, 320, 384],
+        (1, 3): [0, 32, 40, 48, 56, 64, 80, 96,
+                 112, 128, 160, 192, 224, 256, 320],
+        (2, 1): [0, 32, 48, 56, 64, 80, 96, 112,
+                 128, 144, 160, 176, 192, 224, 256],
+        (2, 2): [0, 8, 16, 24, 32, 40, 48, 56,
+                 64, 80, 96, 112, 128, 144, 160],
+        (2, 3): [0, 8, 16, 24, 32, 40, 48, 56,
+                 64, 80, 96, 112, 128, 144, 160]
+    }
+    # MPEG audio sample rates, by version bits
+    _MPEG_RATES = {
+        3: [44100, 48000, 32000],
+        2: [22050, 24000, 16000],
+        0: [11025, 12000, 8000]
+    }
+    # Bytes searched for first MPEG frame
+    _MPEG_SEARCH = 65536
+    # Bytes searched for last Ogg page
+    _OGG_SEARCH = 65536
+    # Bigger headers are not read
+    _MAX_HEADER = 16*1024*1024
+
+    """
+        Return tags for file at path
+        @param path as str
+        @return (title as str, artists as str "artist1;artist2",
+                 album artist as str or None, album as str,
+                 genres as str "genre1;genre2", discnumber as int,
+                 tracknumber as int, year as int or None, length as float)
+                 or None if file can't be read
+    """
+    def get_tags(self, path):
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(12)
+                if header.startswith(b'ID3'):
+                    tags = self._read_mpeg(f)
+                elif header.startswith(b'fLaC'):
+                    tags = self._read_flac(f)
+                elif header.startswith(b'OggS'):
+                    tags = self._read_ogg(f)
+                elif header[4:8] == b'ftyp':
+                    tags = self._read_mp4(f)
+                else:
+                    tags = None
+        except Exception as e:
+            debug("NativeTagReader::get_tags(): %s %s" % (e, ascii(path)))
+            tags = None
+        if tags is None or not tags.get('length'):
+            return None
+        return self._get_tuple(tags, path)
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Convert tags dict to TagReader.get_tags() tuple
+        @param tags as {name as str: value}
+        @param path as str
+        @return tuple
+    """
+    def _get_tuple(self, tags, path):
+        if tags.get('title'):
+            title = tags['title'][0]
+        else:
+            title = os.path.basename(path)
+        if tags.get('artist'):
+            artists = ";".join(tags['artist'])
+        else:
+            artists = _("Unknown")
+        if tags.get('album-artist'):
+            aartist = tags['album-artist'][0]
+        else:
+            aartist = None
+        if tags.get('album'):
+            album = tags['album'][0]
+        else:
+            album = _("Unknown")
+        if tags.get('genre'):
+            genres = ";".join(tags['genre'])
+        else:
+            genres = _("Unknown")
+        discnumber = tags.get('album-disc-number', 0)
+        tracknumber = tags.get('track-number', 0)
+        year = tags.get('year', None)
+        return (title, artists, aartist, album, genres,
+                discnumber, tracknumber, year, tags['length'])
+
+    """
+        Add text values to tags
+        Numbers and years are parsed, first value wins
+        @param tags as {name as str: value}
+        @param name as str
+        @param values as [str]
+        @return False if values can't be handled
+    """
+    def _add_values(self, tags, name, values):
+        values = [value.strip() for value in values if value.strip()]
+        if not values or name in tags:
+            return True
+        if name in ['track-number', 'album-disc-number']:
+            match = re.match(r'\s*(\d+)', values[0])
+            if match is not None:
+                tags[name] = int(match.group(1))
+        elif name == 'year':
+            match = re.match(r'\s*(\d{4})', values[0])
+            if match is not None:
+                tags[name] = int(match.group(1))
+        elif name == 'genre':
+            # ID3v1 genre references are resolved by GStreamer
+            for value in values:
+                if re.match(r'^(\(\d+\)|\d+$|\((RX|CR)\))', value):
+                    return False
+            tags[name] = values
+        else:
+            tags[name] = values
+        return True
+
+    """
+        Read ID3v2 tag and MPEG audio duration
+        @param f as file
+        @return {name as str: value} or None
+    """
+    def _read_mpeg(self, f):
+        f.seek(0)
+        header = f.read(10)
+        major = header[3]
+        flags = header[5]
+        size = self._syncsafe(header[6:10])
+        # Unsynchronised tags are rare, let GStreamer handle them
+        if major not in [2, 3, 4] or flags & 0x80 or size > self._MAX_HEADER:
+            return None
+        tags = self._parse_id3(f.read(size), major, flags)
+        if tags is None:
+            return None
+        start = 10 + size
+        if major == 4 and flags & 0x10:
+            start += 10
+        f.seek(0, 2)
+        end = f.tell()
+        if end >= 128:
+            f.seek(-128, 2)
+            if f.read(3) == b'TAG':
+                end -= 128
+                # GStreamer merges ID3v1 tag, missing values may be there
+                for name in ['title', 'artist', 'album']:
+                    if name not in tags:
+                        return None
+        tags['length'] = self._get_mpeg_length(f, start, end)
+        return tags
+
+    """
+        Parse ID3v2 frames
+        @param data as bytes, tag without header
+        @param major as int, ID3v2 version
+        @param flags as int, tag flags
+        @return {name as str: value} or None
+    """
+    def _parse_id3(self, data, major, flags):
+        tags = {}
+        pos = 0
+        # Extended header
+        if flags & 0x40:
+            if major == 3:
+                pos = 4 + unpack_from('>I', data, 0)[0]
+            elif major == 4:
+                pos = self._syncsafe(data[0:4])
+            else:
+                return None
+        if major == 2:
+            (id_size, header_size) = (3, 6)
+        else:
+            (id_size, header_size) = (4, 10)
+        while pos + header_size <= len(data):
+            frame_id = data[pos:pos+id_size]
+            if frame_id[0] == 0:
+                break
+            if major == 2:
+                frame_size = int.from_bytes(data[pos+3:pos+6], 'big')
+                frame_flags = 0
+            elif major == 3:
+                frame_size = unpack_from('>I', data, pos+4)[0]
+                frame_flags = unpack_from('>H', data, pos+8)[0]
+            else:
+                frame_size = self._syncsafe(data[pos+4:pos+8])
+                frame_flags = unpack_from('>H', data, pos+8)[0]
+            pos += header_size
+            body = data[pos:pos+frame_size]
+            pos += frame_size
+            name = self._ID3_FRAMES.get(frame_id.decode('latin-1'))
+            if name is None:
+                continue
+            # Compressed or encrypted frames
+            if (major == 3 and frame_flags & 0x00c0) or\
+               (major == 4 and frame_flags & 0x000e):
+                return None
+            # Data length indicator
+            if major == 4 and frame_flags & 0x0001:
+                body = body[4:]
+            if not body:
+                continue
+            if not self._add_values(tags, name, self._decode_id3(body)):
+                return None
+        return tags
+
+    """
+        Decode ID3v2 text frame
+        @param body as bytes
+        @return [str]
+    """
+    def _decode_id3(self, body):
+        encoding = body[0]
+        data = body[1:]
+        if encoding == 0:
+            text = data.decode('latin-1')
+        elif encoding == 1:
+            if len(data) % 2:
+                data = data[:-1]
+            text = data.decode('utf-16', 'replace')
+        elif encoding == 2:
+            if len(data) % 2:
+                data = data[:-1]
+            text = data.decode('utf-16-be', 'replace')
+        else:
+            text = data.decode('utf-8', 'replace')
+        # ID3v2.4 values are null separated, each utf-16 value has a BOM
+        return [value.replace('\ufeff', '') for value in text.split('\x00')]
+
+    """
+        Return MPEG audio duration
+        Use Xing/VBRI header if available, else assume constant bitrate
+        @param f as file
+        @param start as int, audio start offset
+        @param end as int, audio end offset
+        @return length as float or None
+    """
+    def _get_mpeg_length(self, f, start, end):
+        f.seek(start)
+        data = f.read(self._MPEG_SEARCH)
+        pos = data.find(b'\xff')
+        while pos != -1 and pos + 4 <= len(data):
+            frame = self._parse_mpeg_header(unpack_from('>I', data, pos)[0])
+            if frame is not None:
+                (version, layer, bitrate, rate, mono, samples, size) = frame
+                # Check next frame to avoid false sync
+                following = pos + size
+                if following + 4 > len(data) or self._parse_mpeg_header(
+                        unpack_from('>I', data, following)[0]) is not None:
+                    break
+            pos = data.find(b'\xff', pos + 1)
+        else:
+            return None
+        # Xing/Info header is after side informations
+        if version == 3:
+            offset = 17 if mono else 32
+        else:
+            offset = 9 if mono else 17
+        xing = pos + 4 + offset
+        if data[xing:xing+4] in [b'Xing', b'Info'] and\
+           len(data) >= xing + 12:
+            if unpack_from('>I', data, xing+4)[0] & 0x1:
+                frames = unpack_from('>I', data, xing+8)[0]
+                return frames * samples / rate
+        vbri = pos + 36
+        if data[vbri:vbri+4] == b'VBRI' and len(data) >= vbri + 18:
+            frames = unpack_from('>I', data, vbri+14)[0]
+            return frames * samples / rate
+        return (end - start - pos) * 8 / (bitrate * 1000)
+
+    """
+        Parse MPEG audio frame header
+        @param header as int
+        @return (version as int, layer as int, bitrate as int kbps,
+                 sample rate as int, mono as bool, samples per frame as int,
+                 frame size as int) or None if not a valid header
+    """
+    def _parse_mpeg_header(self, header):
+        if header >> 21 != 0x7ff:
+            return None
+        version = (header >> 19) & 0x3
+        layer = 4 - ((header >> 17) & 0x3)
+        bitrate_index = (header >> 12) & 0xf
+        rate_index = (header >> 10) & 0x3
+        padding = (header >> 9) & 0x1
+        mono = (header >> 6) & 0x3 == 3
+        if version == 1 or layer == 4 or\
+           bitrate_index in [0, 15] or rate_index == 3:
+            return None
+        key = (1 if version == 3 else 2, layer)
+        bitrate = self._MPEG_BITRATES[key][bitrate_index]
+        rate = self._MPEG_RATES[version][rate_index]
+        if layer == 1:
+            samples = 384
+            size = (12 * bitrate * 1000 // rate + padding) * 4
+        elif layer == 2 or version == 3:
+            samples = 1152
+            size = 144 * bitrate * 1000 // rate + padding
+        else:
+            samples = 576
+            size = 72 * bitrate * 1000 // rate + padding
+        return (version, layer, bitrate, rate, mono, samples, size)
+
+    """
+        Read FLAC metadata blocks
+        @param f as file
+        @return {name as str: value} or None
+    """
+    def _read_flac(self, f):
+        tags = {}
+        f.seek(4)
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                return None
+            block_type = header[0] & 0x7f
+            size = int.from_bytes(header[1:4], 'big')
+            if block_type == 0:
+                data = f.read(size)
+                rate = (data[10] << 12) | (data[11] << 4) | (data[12] >> 4)
+                total = ((data[13] & 0x0f) << 32) |\
+                    unpack_from('>I', data, 14)[0]
+                if rate and total:
+                    tags['length'] = total / rate
+            elif block_type == 4:
+                if not self._parse_vorbis_comment(f.read(size), tags):
+                    return None
+            else:
+                f.seek(size, 1)
+            if header[0] & 0x80:
+                break
+        return tags
+
+    """
+        Parse vorbis comment
+        @param data as bytes, starting at vendor length
+        @param tags as {name as str: value}
+        @return False if comment can't be handled
+    """
+    def _parse_vorbis_comment(self, data, tags):
+        values = {}
+        pos = 4 + unpack_from('<I', data, 0)[0]
+        count = unpack_from('<I', data, pos)[0]
+        pos += 4
+        for i in range(0, count):
+            size = unpack_from('<I', data, pos)[0]
+            pos += 4
+            comment = data[pos:pos+size].decode('utf-8', 'replace')
+            pos += size
+            (field, sep, value) = comment.partition('=')
+            name = self._VORBIS_FIELDS.get(field.upper())
+            if name is not None:
+                if name not in values:
+                    values[name] = []
+                values[name].append(value)
+        for name in values.keys():
+            if not self._add_values(tags, name, values[name]):
+                return False
+        return True
+
+    """
+        Read Ogg Vorbis/Opus headers and last granule position
+        @param f as file
+        @return {name as str: value} or None
+    """
+    def _read_ogg(self, f):
+        tags = {}
+        f.seek(0)
+        serial = None
+        packets = []
+        packet = b''
+        # First two packets: codec identification and comments
+        while len(packets) < 2:
+            header = f.read(27)
+            if len(header) < 27 or not header.startswith(b'OggS'):
+                return None
+            page_serial = unpack_from('<I', header, 14)[0]
+            lacing = f.read(header[26])
+            body = f.read(sum(lacing))
+            if serial is None:
+                serial = page_serial
+            elif page_serial != serial:
+                continue
+            pos = 0
+            for size in lacing:
+                packet += body[pos:pos+size]
+                pos += size
+                if size < 255:
+                    packets.append(packet)
+                    packet = b''
+                    if len(packets) == 2:
+                        break
+            if len(packet) > self._MAX_HEADER:
+                return None
+        if packets[0].startswith(b'\x01vorbis') and\
+           packets[1].startswith(b'\x03vorbis'):
+            rate = unpack_from('<I', packets[0], 12)[0]
+            skip = 0
+            comment = packets[1][7:]
+        elif packets[0].startswith(b'OpusHead') and\
+                packets[1].startswith(b'OpusTags'):
+            rate = 48000
+            skip = unpack_from('<H', packets[0], 10)[0]
+            comment = packets[1][8:]
+        else:
+            return None
+        if not self._parse_vorbis_comment(comment, tags):
+            return None
+        # Length from last page granule position
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(max(0, size - self._OGG_SEARCH))
+        data = f.read()
+        pos = data.rfind(b'OggS')
+        while pos != -1:
+            if pos + 27 <= len(data) and\
+               unpack_from('<I', data, pos+14)[0] == serial:
+                granule = unpack_from('<q', data, pos+6)[0]
+                if granule > 0 and rate:
+                    tags['length'] = (granule - skip) / rate
+                break
+            pos = data.rfind(b'OggS', 0, pos)
+        return tags
+
+    """
+        Read MP4 moov atom
+        @param f as file
+        @return {name as str: value} or None
+    """
+    def _read_mp4(self, f):
+        f.seek(0, 2)
+        size = f.tell()
+        # Top level atoms, moov may be after mdat
+        pos = 0
+        while pos + 8 <= size:
+            f.seek(pos)
+            header = f.read(16)
+            atom_size = unpack_from('>I', header, 0)[0]
+            atom_type = header[4:8]
+            header_size = 8
+            if atom_size == 1:
+                atom_size = unpack_from('>Q', header, 8)[0]
+                header_size = 16
+            elif atom_size == 0:
+                atom_size = size - pos
+            if atom_size < header_size:
+                return None
+            if atom_type == b'moov':
+                if atom_size > self._MAX_HEADER:
+                    return None
+                f.seek(pos + header_size)
+                moov = f.read(atom_size - header_size)
+                return self._parse_moov(moov)
+            pos += atom_size
+        return None
+
+    """
+        Parse MP4 moov atom
+        @param data as bytes
+        @return {name as str: value} or None
+    """
+    def _parse_moov(self, data):
+        tags = {}
+        for (name, start, end) in self._get_atoms(data, 0, len(data)):
+            if name == b'mvhd':
+                if data[start] == 1:
+                    scale = unpack_from('>I', data, start+20)[0]
+                    duration = unpack_from('>Q', data, start+24)[0]
+                else:
+                    scale = unpack_from('>I', data, start+12)[0]
+                    duration = unpack_from('>I', data, start+16)[0]
+                if scale:
+                    tags['length'] = duration / scale
+            elif name == b'udta':
+                for (name, start, end) in self._get_atoms(data, start, end):
+                    if name != b'meta':
+                        continue
+                    # meta is a full atom, except in QuickTime files
+                    if data[start+4:start+8] != b'hdlr':
+                        start += 4
+                    for (name, start, end) in self._get_atoms(data,
+                                                              start, end):
+                        if name == b'ilst' and\
+                           not self._parse_ilst(data, start, end, tags):
+                            return None
+        return tags
+
+    """
+        Parse MP4 ilst atom
+        @param data as bytes
+        @param start as int
+        @param end as int
+        @param tags as {name as str: value}
+        @return False if items can't be handled
+    """
+    def _parse_ilst(self, data, start, end, tags):
+        for (item, start, end) in self._get_atoms(data, start, end):
+            # Genre as ID3v1 index
+            if item == b'gnre':
+                return False
+            name = self._MP4_ITEMS.get(item)
+            if name is None:
+                continue
+            for (atom, start, end) in self._get_atoms(data, start, end):
+                if atom != b'data':
+                    continue
+                value = data[start+8:end]
+                if name in ['track-number', 'album-disc-number']:
+                    if len(value) >= 4:
+                        number = unpack_from('>H', value, 2)[0]
+                        if number and name not in tags:
+                            tags[name] = number
+                elif not self._add_values(
+                        tags, name, [value.decode('utf-8', 'replace')]):
+                    return False
+        return True
+
+    """
+        Return child atoms
+        @param data as bytes
+        @param start as int
+        @param end as int
+        @return generator of (type as bytes, data start as int,
+                              data end as int)
+    """
+    def _get_atoms(self, data, start, end):
+        pos = start
+        while pos + 8 <= end:
+            size = unpack_from('>I', data, pos)[0]
+            header_size = 8
+            if size == 1:
+                size = unpack_from('>Q', data, pos+8)[0]
+                header_size = 16
+            elif size == 0:
+                size = end - pos
+            if size < header_size or pos + size > end:
+                return
+            yield (data[pos+4:pos+8], pos + header_size, pos + size)
+            pos += size
+
+    """
+        Decode ID3v2 syncsafe integer
+        @param data as bytes
+        @return int
+    """
+    def _syncsafe(self, data):
+        return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
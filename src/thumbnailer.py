@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+from _thread import start_new_thread
+from threading import Lock
+from heapq import heappush, heappop
+
+from lollypop.define import Objects
+
+
+# Cache album covers in background, one thread
+# Visible albums are cached first, then prefetched ones
+# Player emits "cover-changed" when an album cover is ready
+class Thumbnailer:
+    _VISIBLE = 0
+    _PREFETCH = 1
+
+    """
+        Init thumbnailer
+    """
+    def __init__(self):
+        # Heap of (priority, order, album id)
+        self._queue = []
+        # Waiting albums as {album id: priority}
+        self._priorities = {}
+        self._order = 0
+        self._lock = Lock()
+        self._running = False
+
+    """
+        Queue albums, already queued ones may get a higher priority
+        @param album ids as [int]
+        @param visible as bool
+        @thread safe
+    """
+    def add(self, album_ids, visible=True):
+        if visible:
+            priority = self._VISIBLE
+        else:
+            priority = self._PREFETCH
+        with self._lock:
+            for album_id in album_ids:
+                current = self._priorities.get(album_id)
+                if current is not None and current <= priority:
+                    continue
+                self._priorities[album_id] = priority
+                heappush(self._queue, (priority, self._order, album_id))
+                self._order += 1
+            if self._priorities and not self._running:
+                self._running = True
+                start_new_thread(self._run, ())
+
+    """
+        Drop queued albums
+    """
+    def stop(self):
+        with self._lock:
+            self._queue = []
+            self._priorities = {}
+
+#######################
+# PRIVATE             #
+#######################
+    """
+        Return next album to cache
+        @return album id as int or None
+    """
+    def _pop(self):
+        with self._lock:
+            while self._queue:
+                (priority, order, album_id) = heappop(self._queue)
+                # Else, album has been queued again with another priority
+                if self._priorities.get(album_id) == priority:
+                    del self._priorities[album_id]
+                    return album_id
+            self._running = False
+            return None
+
+    """
+        Cache queued albums
+        @thread safe
+    """
+    def _run(self):
+        sql = Objects.db.get_cursor()
+        album_id = self._pop()
+        while album_id is not None:
+            try:
+                if Objects.art.cache_album(album_id, sql):
+                    GLib.idle_add(Objects.player.announce_cover_update,
+                                  album_id)
+            except Exception as e:
+                print("Thumbnailer::_run(): %s" % e)
+            album_id = self._pop()
+        sql.close()
@@ -13,10 +13,16 @@
 
 from gi.repository import Gtk, GLib
 
+from time import time
+
 from lollypop.define import Objects
 
 # Generic view
 class View(Gtk.Grid):
+    # Items prefetched together by populate thread
+    _PREFETCH_SIZE = 20
+    # Time spent adding items per main loop iteration, in seconds
+    _FRAME_TIME = 0.010
 
     def __init__(self):
         Gtk.Grid.__init__(self)
@@ -28,6 +34,9 @@ class View(Gtk.Grid):
                                                     self._on_cover_changed)
         # Stop populate thread
         self._stop = False
+        # Items waiting for _add_item()
+        self._pending = []
+        self._adding = False
 
         self._scrolledWindow = Gtk.ScrolledWindow()
         self._scrolledWindow.set_policy(Gtk.PolicyType.AUTOMATIC,
@@ -84,6 +93,38 @@ class View(Gtk.Grid):
     def _get_children(self):
         return []
 
+    """
+        Queue items for _add_item(), items are added in order,
+        as many as possible per main loop iteration
+        @param items as [object]
+    """
+    def _queue_items(self, items):
+        self._pending += items
+        if not self._adding:
+            self._adding = True
+            GLib.idle_add(self._add_items)
+
+    """
+        Add pending items until frame time is elapsed
+        @return True if items remain
+    """
+    def _add_items(self):
+        start = time()
+        while self._pending and not self._stop:
+            self._add_item(self._pending.pop(0))
+            if time() - start > self._FRAME_TIME:
+                return True
+        self._pending = []
+        self._adding = False
+        return False
+
+    """
+        Add an item to view
+        @param item as object
+    """
+    def _add_item(self, item):
+        pass
+
     """
         Update album cover in view
         @param widget as unused, album id as int
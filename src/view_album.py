@@ -32,6 +32,7 @@ class ArtistView(View):
     def __init__(self, artist_id, show_artist_details):
         View.__init__(self)
         self._artist_id = artist_id
+        self._genre_id = None
         self._signal_id = None
 
         if show_artist_details:
@@ -71,7 +72,26 @@ class ArtistView(View):
             albums = Objects.albums.get_ids(self._artist_id,
                                             navigation_id,
                                             sql)
-        GLib.idle_add(self._add_albums, albums, navigation_id)
+        self._genre_id = navigation_id
+        # Load infos and covers by chunks, main loop adds widgets meanwhile
+        for i in range(0, len(albums), self._PREFETCH_SIZE):
+            if self._stop:
+                break
+            chunk = albums[i:i+self._PREFETCH_SIZE]
+            infos = Objects.albums.get_detailed_infos(chunk,
+                                                      navigation_id,
+                                                      sql)
+            items = []
+            for album_id in chunk:
+                # Album removed since listing
+                if album_id not in infos:
+                    continue
+                items.append((album_id,
+                              infos[album_id],
+                              Objects.art.get_cached(album_id,
+                                                     ArtSize.BIG,
+                                                     sql)))
+            GLib.idle_add(self._queue_items, items)
         sql.close()
 
 #######################
@@ -85,25 +105,25 @@ class ArtistView(View):
         return self._albumbox.get_children()
 
     """
-        Pop an album and add it to the view,
-        repeat operation until album list is empty
-        @param [album ids as int]
-        @param genre id as int
+        Add an album to the view
+        @param item as (album id as int,
+                        infos as DatabaseAlbums.get_detailed_infos() value,
+                        cover as AlbumArt.get_cached())
     """
-    def _add_albums(self, albums, genre_id):
+    def _add_item(self, item):
+        (album_id, infos, cover) = item
         size_group = Gtk.SizeGroup(mode=Gtk.SizeGroupMode.HORIZONTAL)
-        if albums and not self._stop:
-            widget = AlbumDetailedWidget(albums.pop(0),
-                                         genre_id,
-                                         self._show_menu,
-                                         False,
-                                         size_group)
-            widget.show()
-            start_new_thread(widget.populate, ())
-            self._albumbox.add(widget)
-            GLib.idle_add(self._add_albums, albums, genre_id)
-        else:
-            self._stop = False
+        widget = AlbumDetailedWidget(album_id,
+                                     self._genre_id,
+                                     self._show_menu,
+                                     False,
+                                     size_group,
+                                     infos,
+                                     cover)
+        widget.show()
+        # Infos already loaded, no db access
+        widget.populate()
+        self._albumbox.add(widget)
 
 
 # Album contextual view
@@ -133,7 +153,14 @@ class AlbumContextView(View):
 
 
 # Album view is a flowbox of albums widgets with album name and artist name
+# Widgets are added while scrolling, covers are only loaded for
+# visible widgets and one page above/below, others are released
 class AlbumView(View):
+    # Widgets added when scrolling near the end of the view
+    _PAGE_SIZE = 40
+    # Wait for scrolling to settle before loading covers, in ms
+    _COVERS_DELAY = 100
+
     """
         Init album view ui with a scrolled flow box and a scrolled context view
         @param navigation id as int
@@ -145,6 +172,13 @@ class AlbumView(View):
         self._genre_id = navigation_id
         self._albumsongs = None
         self._context_widget = None
+        # Albums as [(album id, AlbumSimpleWidget infos)]
+        self._albums = []
+        # Number of albums added to flowbox
+        self._added = 0
+        # Widgets with a loaded cover
+        self._loaded = set()
+        self._covers_id = None
 
         self._albumbox = Gtk.FlowBox()
         self._albumbox.set_selection_mode(Gtk.SelectionMode.NONE)
@@ -155,6 +189,9 @@ class AlbumView(View):
         self._viewport.set_property("valign", Gtk.Align.START)
         self._viewport.add(self._albumbox)
         self._scrolledWindow.set_property('expand', True)
+        adj = self._scrolledWindow.get_vadjustment()
+        adj.connect('value-changed', self._on_adjustment_changed)
+        adj.connect('changed', self._on_adjustment_changed)
 
         self._context = ViewContainer(500)
 
@@ -191,7 +228,19 @@ class AlbumView(View):
                                                      sql)
         else:
             albums = Objects.albums.get_ids(None, self._genre_id, sql)
-        GLib.idle_add(self._add_albums, albums)
+        # Load names by chunks, covers are loaded when widgets are visible
+        for i in range(0, len(albums), self._PREFETCH_SIZE):
+            if self._stop:
+                break
+            chunk = albums[i:i+self._PREFETCH_SIZE]
+            names = Objects.albums.get_names(chunk, sql)
+            items = []
+            for album_id in chunk:
+                if album_id not in names:
+                    continue
+                (album_name, artist_name) = names[album_id]
+                items.append((album_id, (album_name, artist_name, None)))
+            GLib.idle_add(self._add_albums, items)
         sql.close()
 
 #######################
@@ -255,16 +304,130 @@ class AlbumView(View):
             self._context.show()
 
     """
-        Pop an album and add it to the view,
-        repeat operation until album list is empty
-        @param [album ids as int]
+        Add albums to view, widgets are created when needed
+        @param items as [(album id as int, AlbumSimpleWidget infos)]
     """
-    def _add_albums(self, albums):
-        if albums and not self._stop:
-            widget = AlbumSimpleWidget(albums.pop(0))
-            widget.show()
-            self._albumbox.insert(widget, -1)
-            GLib.idle_add(self._add_albums, albums)
-        else:
-            self._stop = False
+    def _add_albums(self, items):
+        self._albums += items
+        self._fill()
+
+    """
+        Add a page of widgets if less than a page is left below visible area
+    """
+    def _fill(self):
+        if self._stop or self._adding or self._added >= len(self._albums):
+            return
+        adj = self._scrolledWindow.get_vadjustment()
+        page_size = adj.get_page_size()
+        # Not allocated yet, wait for adjustment to change
+        if page_size == 0 and self._added:
+            return
+        if adj.get_upper() - adj.get_value() - page_size <= page_size:
+            items = self._albums[self._added:self._added+self._PAGE_SIZE]
+            self._added += len(items)
+            self._queue_items(items)
+            # Cache next page covers
+            Objects.thumbnailer.add(
+                [item[0] for item in
+                 self._albums[self._added:self._added+self._PAGE_SIZE]],
+                False)
+
+    """
+        Load visible covers once scrolling settled
+    """
+    def _schedule_covers(self):
+        if self._covers_id is None:
+            self._covers_id = GLib.timeout_add(self._COVERS_DELAY,
+                                               self._update_visible_covers)
+
+    """
+        Load covers for visible widgets, release others
+    """
+    def _update_visible_covers(self):
+        self._covers_id = None
+        if self._stop:
+            return False
+        adj = self._scrolledWindow.get_vadjustment()
+        top = adj.get_value() - adj.get_page_size()
+        bottom = adj.get_value() + adj.get_page_size() * 2
+        children = self._albumbox.get_children()
+        # Children are in flowbox order, search first visible one
+        start = 0
+        end = len(children)
+        while start < end:
+            middle = (start + end) // 2
+            allocation = children[middle].get_allocation()
+            if allocation.y + allocation.height < top:
+                start = middle + 1
+            else:
+                end = middle
+        visible = set()
+        widgets = []
+        for child in children[start:]:
+            if child.get_allocation().y > bottom:
+                break
+            widget = child.get_child()
+            visible.add(widget)
+            if widget not in self._loaded:
+                widgets.append(widget)
+        for widget in self._loaded - visible:
+            widget.clear_cover()
+        self._loaded = visible
+        if widgets:
+            start_new_thread(self._load_covers,
+                             ([(widget, widget.get_id())
+                               for widget in widgets],))
+        return False
+
+    """
+        Load cached covers for widgets
+        @param items as [(widget as AlbumSimpleWidget, album id as int)]
+        @thread safe
+    """
+    def _load_covers(self, items):
+        sql = Objects.db.get_cursor()
+        for (widget, album_id) in items:
+            if self._stop:
+                break
+            pixbuf = Objects.art.get_cached(album_id, ArtSize.BIG, sql)
+            GLib.idle_add(self._set_cover, widget, pixbuf)
+        sql.close()
+
+    """
+        Set widget cover if still visible
+        @param widget as AlbumSimpleWidget
+        @param pixbuf as Gdk.Pixbuf or None
+    """
+    def _set_cover(self, widget, pixbuf):
+        if widget in self._loaded and widget.is_cleared():
+            widget.set_cover_from_pixbuf(pixbuf)
+
+    """
+        Add pending items, fill view and load covers once done
+        @return True if items remain
+    """
+    def _add_items(self):
+        if View._add_items(self):
+            return True
+        self._fill()
+        self._schedule_covers()
+        return False
+
+    """
+        Add an album to the view, cover is loaded when visible
+        @param item as (album id as int, AlbumSimpleWidget infos)
+    """
+    def _add_item(self, item):
+        (album_id, infos) = item
+        widget = AlbumSimpleWidget(album_id, infos, True)
+        widget.show()
+        self._albumbox.insert(widget, -1)
+
+    """
+        Add widgets and load covers when scrolling
+        @param adj as Gtk.Adjustment
+    """
+    def _on_adjustment_changed(self, adj):
+        self._fill()
+        self._schedule_covers()
 
@@ -30,6 +30,8 @@ class AlbumWidget(Gtk.Bin):
         self._selected = None
         self._stop = False
         self._cover = None
+        # True if cover has been released by clear_cover()
+        self._cleared = False
 
     """
         Set cover for album if state changed
@@ -37,11 +39,10 @@ class AlbumWidget(Gtk.Bin):
     """
     def set_cover(self, force=False):
         selected = self._album_id==Objects.player.current.album_id
-        if self._cover and (selected != self._selected or force):
+        if self._cover and not self._cleared and\
+           (selected != self._selected or force):
             self._selected = selected
-            pixbuf = Objects.art.get(self._album_id,
-                                     ArtSize.BIG,
-                                     selected)
+            pixbuf = self._get_cover()
             self._cover.set_from_pixbuf(pixbuf)
             del pixbuf
 
@@ -50,11 +51,9 @@ class AlbumWidget(Gtk.Bin):
         @param album id as int
     """
     def update_cover(self, album_id):
-        if self._cover and self._album_id == album_id:
+        if self._cover and not self._cleared and self._album_id == album_id:
             self._selected = self._album_id==Objects.player.current.album_id
-            pixbuf = Objects.art.get(self._album_id,
-                                     ArtSize.BIG,
-                                     self._selected)
+            pixbuf = self._get_cover()
             self._cover.set_from_pixbuf(pixbuf)
             del pixbuf
 
@@ -64,6 +63,37 @@ class AlbumWidget(Gtk.Bin):
     def update_playing_indicator(self):
         pass
 
+    """
+        Set cover from a pixbuf loaded by AlbumArt.get_cached()
+        @param pixbuf as Gdk.Pixbuf or None to load it now
+    """
+    def set_cover_from_pixbuf(self, pixbuf):
+        self._cleared = False
+        if pixbuf is None:
+            self.set_cover()
+        elif self._cover:
+            self._selected = self._album_id==Objects.player.current.album_id
+            self._cover.set_from_pixbuf(Objects.art.get_frame(pixbuf,
+                                                              ArtSize.BIG,
+                                                              self._selected))
+
+    """
+        Release cover pixbuf, set_cover() and update_cover() do nothing
+        until set_cover_from_pixbuf() is called
+    """
+    def clear_cover(self):
+        if self._cover:
+            self._cleared = True
+            self._selected = None
+            self._cover.clear()
+
+    """
+        True if cover has been released
+        @return bool
+    """
+    def is_cleared(self):
+        return self._cleared
+
     """
         Stop populating
     """
@@ -73,6 +103,21 @@ class AlbumWidget(Gtk.Bin):
 #######################
 # PRIVATE             #
 #######################
+    """
+        Return framed cover, use default one while
+        cover is cached in background
+        @return pixbuf
+    """
+    def _get_cover(self):
+        if Objects.art.is_cached(self._album_id, ArtSize.BIG):
+            return Objects.art.get(self._album_id,
+                                   ArtSize.BIG,
+                                   self._selected)
+        Objects.thumbnailer.add([self._album_id])
+        return Objects.art.get_frame(Objects.art.get_default(ArtSize.BIG),
+                                     ArtSize.BIG,
+                                     self._selected)
+
     """
         Add hover style
         @param widget as Gtk.Widget
@@ -97,8 +142,14 @@ class AlbumSimpleWidget(AlbumWidget):
             - Album cover
             - Album name
             - Artist name
+        @param album id as int
+        @param infos as (album name as str, artist name as str,
+                         cover as AlbumArt.get_cached()),
+               None to load them now
+        @param lazy as bool, if True, cover is left empty until
+               set_cover_from_pixbuf() is called, widget size doesn't change
     """
-    def __init__(self, album_id):
+    def __init__(self, album_id, infos=None, lazy=False):
         AlbumWidget.__init__(self, album_id)
 
         builder = Gtk.Builder()
@@ -106,16 +157,25 @@ class AlbumSimpleWidget(AlbumWidget):
         builder.connect_signals(self)
         self._cover = builder.get_object('cover')
 
-        album_name = Objects.albums.get_name(album_id)
+        if infos is None:
+            album_name = Objects.albums.get_name(album_id)
+            artist_name = Objects.albums.get_artist_name(album_id)
+            pixbuf = None
+        else:
+            (album_name, artist_name, pixbuf) = infos
         title = builder.get_object('title')
         title.set_label(album_name)
-        artist_name = Objects.albums.get_artist_name(album_id)
         artist_name = translate_artist_name(artist_name)
         artist = builder.get_object('artist')
         artist.set_label(artist_name)
 
         self.add(builder.get_object('widget'))
-        self.set_cover()
+        if lazy:
+            self._cover.set_size_request(ArtSize.BIG+ArtSize.BORDER*2,
+                                         ArtSize.BIG+ArtSize.BORDER*2)
+            self._cleared = True
+        else:
+            self.set_cover_from_pixbuf(pixbuf)
 
     def do_get_preferred_width(self):
         return (ArtSize.BIG+ArtSize.BORDER*2, ArtSize.BIG+ArtSize.BORDER*2)
@@ -146,13 +206,25 @@ class AlbumDetailedWidget(AlbumWidget):
         @param show_menu as bool if menu need to be displayed
         @param scrolled as bool
         @param size group as Gtk.SizeGroup
+        @param infos as DatabaseAlbums.get_detailed_infos() value for album,
+               None to load them in populate()
+        @param cover as AlbumArt.get_cached(), None to load it now
     """
-    def __init__(self, album_id, genre_id, show_menu, scrolled, size_group):
+    def __init__(self, album_id, genre_id, show_menu,
+                 scrolled, size_group, infos=None, cover=None):
         AlbumWidget.__init__(self, album_id)
 
-        self._artist_id = Objects.albums.get_artist_id(album_id)
+        # Set by populate()
+        self._artist_id = None
         self._album_id = album_id
         self._genre_id = genre_id
+        self._show_menu = show_menu
+        self._size_group = size_group
+        self._infos = infos
+        self._artist_names = {}
+        self._discs = []
+        self._tracks_left = {}
+        self._tracks_right = {}
 
         builder = Gtk.Builder()
         if scrolled:
@@ -169,54 +241,15 @@ class AlbumDetailedWidget(AlbumWidget):
         self._stars.append(builder.get_object('star2'))
         self._stars.append(builder.get_object('star3'))
         self._stars.append(builder.get_object('star4'))
-        self._on_leave_notify(None, None)
+        self._set_stars(0, 0)
 
-        grid = builder.get_object('tracks')
-        self._discs = Objects.albums.get_discs(album_id, genre_id)
-        self._tracks_left = {}
-        self._tracks_right = {}
-        show_label = len(self._discs) > 1
-        i = 0
-        for disc in self._discs:
-            if show_label:
-                label = Gtk.Label()
-                label.set_text(_("Disc %s") % disc)
-                label.set_property('halign', Gtk.Align.START)
-                label.get_style_context().add_class('dim-label')
-                if i:
-                    label.set_property('margin-top', 30)
-                label.show()
-                grid.attach(label, 0, i, 2, 1)
-                i += 1
-                sep = Gtk.Separator()
-                sep.show()
-                grid.attach(sep, 0, i ,2 ,1)
-                i += 1
-            self._tracks_left[disc] = TracksWidget(show_menu)
-            self._tracks_right[disc] = TracksWidget(show_menu)
-            grid.attach(self._tracks_left[disc], 0, i, 1, 1)
-            grid.attach(self._tracks_right[disc], 1, i, 1, 1)
-            size_group.add_widget(self._tracks_left[disc])
-            size_group.add_widget(self._tracks_right[disc])
-
-            self._tracks_left[disc].connect('activated', self._on_activated)
-            self._tracks_left[disc].connect('button-press-event',
-                                         self._on_button_press_event)
-            self._tracks_right[disc].connect('activated', self._on_activated)
-            self._tracks_right[disc].connect('button-press-event',
-                                     self._on_button_press_event)
-       
-            self._tracks_left[disc].show()
-            self._tracks_right[disc].show()
-            i += 1
+        self._grid = builder.get_object('tracks')
+        self._title = builder.get_object('title')
+        self._year = builder.get_object('year')
 
         self._cover = builder.get_object('cover')
-        self.set_cover()
+        self.set_cover_from_pixbuf(cover)
 
-        builder.get_object('title').set_label(
-                                            Objects.albums.get_name(album_id))
-        builder.get_object('year').set_label(
-                                            Objects.albums.get_year(album_id))
         self.add(builder.get_object('AlbumDetailedWidget'))
 
         if show_menu:
@@ -247,27 +280,21 @@ class AlbumDetailedWidget(AlbumWidget):
         return self._album_id
 
     """
-        Populate tracks
+        Populate album informations and tracks, thread safe
+        Infos given at init are used without db access,
+        else they are loaded and set in main loop
     """
     def populate(self):
         self._stop = False
-        sql = Objects.db.get_cursor()
-        for disc in self._discs:
-            mid_tracks = int(0.5+Objects.albums.get_count_for_disc(
-                                                          self._album_id,
-                                                          self._genre_id,
-                                                          disc,
-                                                          sql)/2)
-            tracks = Objects.albums.get_tracks_infos(self._album_id,
-                                                     self._genre_id,
-                                                     disc,
-                                                     sql)
-            self.populate_list_left(tracks[:mid_tracks],
-                                    disc,
-                                    1)
-            self.populate_list_right(tracks[mid_tracks:],
-                                     disc,
-                                     mid_tracks + 1)
+        if self._infos is None:
+            sql = Objects.db.get_cursor()
+            infos = Objects.albums.get_detailed_infos([self._album_id],
+                                                      self._genre_id,
+                                                      sql)
+            sql.close()
+            GLib.idle_add(self._set_infos, infos.get(self._album_id))
+        else:
+            self._set_infos(self._infos)
 
     """
         Populate left list, thread safe
@@ -294,6 +321,65 @@ class AlbumDetailedWidget(AlbumWidget):
 #######################
 # PRIVATE             #
 #######################
+    """
+        Set album informations, add discs and populate tracks
+        @param infos as DatabaseAlbums.get_detailed_infos() value for album,
+               None if album does not exist anymore
+    """
+    def _set_infos(self, infos):
+        if infos is None:
+            return
+        (name, year, artist_id, popularity, avg_popularity,
+         discs, self._artist_names) = infos
+        self._artist_id = artist_id
+        self._title.set_label(name)
+        self._year.set_label(year)
+        self._set_stars(popularity, avg_popularity)
+        self._discs = [disc for (disc, tracks) in discs]
+        show_label = len(self._discs) > 1
+        i = 0
+        for disc in self._discs:
+            if show_label:
+                label = Gtk.Label()
+                label.set_text(_("Disc %s") % disc)
+                label.set_property('halign', Gtk.Align.START)
+                label.get_style_context().add_class('dim-label')
+                if i:
+                    label.set_property('margin-top', 30)
+                label.show()
+                self._grid.attach(label, 0, i, 2, 1)
+                i += 1
+                sep = Gtk.Separator()
+                sep.show()
+                self._grid.attach(sep, 0, i ,2 ,1)
+                i += 1
+            self._tracks_left[disc] = TracksWidget(self._show_menu)
+            self._tracks_right[disc] = TracksWidget(self._show_menu)
+            self._grid.attach(self._tracks_left[disc], 0, i, 1, 1)
+            self._grid.attach(self._tracks_right[disc], 1, i, 1, 1)
+            self._size_group.add_widget(self._tracks_left[disc])
+            self._size_group.add_widget(self._tracks_right[disc])
+
+            self._tracks_left[disc].connect('activated', self._on_activated)
+            self._tracks_left[disc].connect('button-press-event',
+                                         self._on_button_press_event)
+            self._tracks_right[disc].connect('activated', self._on_activated)
+            self._tracks_right[disc].connect('button-press-event',
+                                     self._on_button_press_event)
+       
+            self._tracks_left[disc].show()
+            self._tracks_right[disc].show()
+            i += 1
+
+        for (disc, tracks) in discs:
+            mid_tracks = int(0.5+len(tracks)/2)
+            self.populate_list_left(tracks[:mid_tracks],
+                                    disc,
+                                    1)
+            self.populate_list_right(tracks[mid_tracks:],
+                                     disc,
+                                     mid_tracks + 1)
+
     """
         Popup menu for album
         @param widget as Gtk.Button
@@ -327,7 +413,7 @@ class AlbumDetailedWidget(AlbumWidget):
             artist_name = ""
             for artist_id in artist_ids:
                 artist_name += translate_artist_name(
-                                Objects.artists.get_name(artist_id)) + ", "
+                                self._artist_names[artist_id]) + ", "
             title = "<b>%s</b>\n%s" % (escape(artist_name[:-2]),
                                        title)
 
@@ -412,9 +498,16 @@ class AlbumDetailedWidget(AlbumWidget):
         @param event as Gdk.Event (can be None)
     """
     def _on_leave_notify(self, widget, event):
-        avg_popularity = Objects.albums.get_avg_popularity()
+        self._set_stars(Objects.albums.get_popularity(self._album_id),
+                        Objects.albums.get_avg_popularity())
+
+    """
+        Show popularity with stars opacity
+        @param popularity as int
+        @param avg popularity as int
+    """
+    def _set_stars(self, popularity, avg_popularity):
         if avg_popularity > 0:
-            popularity = Objects.albums.get_popularity(self._album_id)
             stars = popularity*5/avg_popularity+0.5
             if stars < 1:
                 for i in range(5):